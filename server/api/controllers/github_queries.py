@@ -0,0 +1,347 @@
+"""GitHub GraphQL documents used by the search controller.
+
+Documents are composed from shared fragments, minified once when they are
+first built, and registered under a stable id (a hash of the minified
+text). The transport looks documents up by id, so callers pass around
+short ids instead of query text, and anything that wants to merge, batch
+or coalesce requests can key on them.
+"""
+
+from __future__ import annotations
+
+import calendar
+import functools
+import hashlib
+import re
+import threading
+from typing import Dict, Iterable
+
+_TOKEN = re.compile(
+    r'\s+|,|#[^\n]*|(\.\.\.|[{}():!$=\[\]@|&]|"(?:\\.|[^"\\])*"|-?\d+(?:\.\d+)?|[_A-Za-z][_0-9A-Za-z]*)'
+)
+_SPREAD = re.compile(r"\.\.\.\s*([_A-Za-z][_0-9A-Za-z]*)")
+_OPERATION_NAME = re.compile(r"^\s*(?:query|mutation)\s+([_A-Za-z][_0-9A-Za-z]*)")
+COST_FIELD = "rateLimit{cost}"
+
+
+class Fragment:
+    __slots__ = ("name", "type_condition", "body")
+
+    def __init__(self, name: str, type_condition: str, body: str):
+        self.name = name
+        self.type_condition = type_condition
+        self.body = body
+
+    @property
+    def definition(self) -> str:
+        return f"fragment {self.name} on {self.type_condition} {{ {self.body} }}"
+
+
+class Document:
+    """A registered query: minified text, plus a variant that also selects ``rateLimit { cost }``."""
+
+    __slots__ = ("id", "name", "text", "text_with_cost")
+
+    def __init__(self, document_id: str, name: str, text: str, text_with_cost: str):
+        self.id = document_id
+        self.name = name
+        self.text = text
+        self.text_with_cost = text_with_cost
+
+    def __repr__(self) -> str:
+        return f"Document({self.name!r}, id={self.id!r})"
+
+
+CONTRIBUTION_TOTAL_FIELDS = (
+    "totalCommitContributions",
+    "totalIssueContributions",
+    "totalPullRequestContributions",
+    "totalPullRequestReviewContributions",
+)
+CALENDAR_DAY_FIELDS = ("date", "contributionCount", "color")
+
+FRAGMENTS: Dict[str, Fragment] = {
+    fragment.name: fragment
+    for fragment in (
+        Fragment("ContributionTotals", "ContributionsCollection", " ".join(CONTRIBUTION_TOTAL_FIELDS)),
+        Fragment(
+            "RepositoriesByCommits",
+            "ContributionsCollection",
+            """commitContributionsByRepository(maxRepositories: 100) {
+              repository { nameWithOwner }
+              contributions { totalCount }
+            }""",
+        ),
+        Fragment(
+            "CalendarWeeks",
+            "ContributionCalendar",
+            f"weeks {{ contributionDays {{ {' '.join(CALENDAR_DAY_FIELDS)} }} }}",
+        ),
+        Fragment(
+            "CalendarCounts",
+            "ContributionCalendar",
+            "weeks { contributionDays { date contributionCount } }",
+        ),
+        Fragment(
+            "HistoryPage",
+            "CommitHistoryConnection",
+            """nodes { additions deletions }
+            pageInfo { hasNextPage endCursor }""",
+        ),
+    )
+}
+
+_documents: Dict[str, Document] = {}
+_lock = threading.Lock()
+
+
+def minify(text: str) -> str:
+    """Drop comments, commas and insignificant whitespace from a GraphQL document."""
+    tokens = [match.group(1) for match in _TOKEN.finditer(text) if match.group(1)]
+    parts: list[str] = []
+    previous = ""
+    for token in tokens:
+        if previous and _is_word(previous[-1]) and _is_word(token[0]):
+            parts.append(" ")
+        parts.append(token)
+        previous = token
+    return "".join(parts)
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char in '_-"'
+
+
+def _fragments_used(text: str) -> list[Fragment]:
+    """Fragments spread in ``text``, including the ones they spread in turn."""
+    used: Dict[str, Fragment] = {}
+    pending = [text]
+    while pending:
+        for name in _SPREAD.findall(pending.pop()):
+            if name == "on" or name in used:
+                continue
+            fragment = FRAGMENTS[name]
+            used[name] = fragment
+            pending.append(fragment.body)
+    return sorted(used.values(), key=lambda fragment: fragment.name)
+
+
+def register(operation: str) -> str:
+    """Minify ``operation`` with the fragments it uses and return its document id."""
+    fragments = "".join(minify(fragment.definition) for fragment in _fragments_used(operation))
+    body = minify(operation)
+    closing = body.rindex("}")
+    text = body + fragments
+    text_with_cost = f"{body[:closing]}{COST_FIELD}{body[closing:]}{fragments}"
+    document_id = hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+    match = _OPERATION_NAME.match(operation)
+    with _lock:
+        if document_id not in _documents:
+            _documents[document_id] = Document(
+                document_id, match.group(1) if match else "", text, text_with_cost
+            )
+    return document_id
+
+
+def document(document_id: str) -> Document:
+    return _documents[document_id]
+
+
+def documents() -> Iterable[Document]:
+    with _lock:
+        return list(_documents.values())
+
+
+COMMIT_SIZE_REPOSITORIES = register(
+    """
+    query CommitSizeRepositories($login: String!, $from: DateTime!, $to: DateTime!) {
+      user(login: $login) {
+        id
+        contributionsCollection(from: $from, to: $to) {
+          ...RepositoriesByCommits
+        }
+      }
+    }
+    """
+)
+
+
+@functools.lru_cache(maxsize=32)
+def repo_focus(with_total: bool, with_repos: bool) -> str:
+    total = "totalCommitContributions" if with_total else ""
+    repos = "...RepositoriesByCommits" if with_repos else ""
+    return register(
+        f"""
+        query RepoFocus($login: String!, $from: DateTime!, $to: DateTime!) {{
+          user(login: $login) {{
+            contributionsCollection(from: $from, to: $to) {{
+              {total}
+              {repos}
+            }}
+          }}
+        }}
+        """
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def commit_count_monthly(year: int, months: tuple[int, ...]) -> str:
+    """One aliased contributionsCollection per month, ``m01`` through ``m12``."""
+    month_aliases = []
+    for month in months:
+        last_day = calendar.monthrange(year, month)[1]
+        since = f"{year}-{month:02d}-01T00:00:00Z"
+        until = f"{year}-{month:02d}-{last_day:02d}T23:59:59Z"
+        month_aliases.append(
+            f"""m{month:02d}: contributionsCollection(from: "{since}", to: "{until}") {{
+              totalCommitContributions
+            }}"""
+        )
+    return register(
+        f"""
+        query CommitCountMonthly($login: String!) {{
+          user(login: $login) {{
+            {" ".join(month_aliases)}
+          }}
+        }}
+        """
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def languages(with_names: bool) -> str:
+    node = "node { name }" if with_names else ""
+    return register(
+        f"""
+        query Languages($login: String!, $from: DateTime!, $to: DateTime!) {{
+          user(login: $login) {{
+            contributionsCollection(from: $from, to: $to) {{
+              commitContributionsByRepository(maxRepositories: 100) {{
+                repository {{
+                  nameWithOwner
+                  languages(first: 20, orderBy: {{field: SIZE, direction: DESC}}) {{
+                    edges {{
+                      size
+                      {node}
+                    }}
+                  }}
+                }}
+              }}
+            }}
+          }}
+        }}
+        """
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def year_summary(selection: tuple[str, ...]) -> str:
+    totals = (
+        "...ContributionTotals"
+        if set(selection) == set(CONTRIBUTION_TOTAL_FIELDS)
+        else " ".join(selection)
+    )
+    return register(
+        f"""
+        query YearSummary($login: String!, $from: DateTime!, $to: DateTime!) {{
+          user(login: $login) {{
+            contributionsCollection(from: $from, to: $to) {{
+              {totals}
+            }}
+          }}
+        }}
+        """
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def contribution_heatmap(with_total: bool, day_fields: tuple[str, ...]) -> str:
+    total = "totalContributions" if with_total else ""
+    if set(day_fields) == set(CALENDAR_DAY_FIELDS):
+        weeks = "...CalendarWeeks"
+    elif day_fields:
+        weeks = f"weeks {{ contributionDays {{ {' '.join(day_fields)} }} }}"
+    else:
+        weeks = ""
+    return register(
+        f"""
+        query ContributionHeatmap($login: String!, $from: DateTime!, $to: DateTime!) {{
+          user(login: $login) {{
+            contributionsCollection(from: $from, to: $to) {{
+              contributionCalendar {{
+                {total}
+                {weeks}
+              }}
+            }}
+          }}
+        }}
+        """
+    )
+
+
+# What a contribution window query selects, by snapshot kind.
+WINDOW_SELECTIONS = {
+    "calendar": "contributionCalendar { ...CalendarCounts }",
+    "totals": "...ContributionTotals",
+}
+
+
+@functools.lru_cache(maxsize=8)
+def contribution_window(with_closed: bool, with_open: bool, kind: str) -> str:
+    """
+    Daily counts (``calendar``) or contribution totals (``totals``) for up
+    to two adjacent windows, aliased ``closed`` and ``open``.
+    """
+    variables = []
+    selections = []
+    for alias, included in (("closed", with_closed), ("open", with_open)):
+        if not included:
+            continue
+        variables.append(f"${alias}From: DateTime!, ${alias}To: DateTime!")
+        selections.append(
+            f"""{alias}: contributionsCollection(from: ${alias}From, to: ${alias}To) {{
+              {WINDOW_SELECTIONS[kind]}
+            }}"""
+        )
+    return register(
+        f"""
+        query ContributionWindow($login: String!, {", ".join(variables)}) {{
+          user(login: $login) {{
+            {" ".join(selections)}
+          }}
+        }}
+        """
+    )
+
+
+@functools.lru_cache(maxsize=128)
+def history_batch(size: int, with_total: bool) -> str:
+    """The next history page for ``size`` repos at once, aliased ``r0`` onwards."""
+    variables = "".join(
+        f", $owner{index}: String!, $name{index}: String!, $first{index}: Int!,"
+        f" $after{index}: String, $since{index}: GitTimestamp, $until{index}: GitTimestamp"
+        for index in range(size)
+    )
+    total = "totalCount" if with_total else ""
+    selections = "\n".join(
+        f"""r{index}: repository(owner: $owner{index}, name: $name{index}) {{
+          defaultBranchRef {{
+            target {{
+              ... on Commit {{
+                history(first: $first{index}, since: $since{index}, until: $until{index}, author: {{id: $author}}, after: $after{index}) {{
+                  {total}
+                  ...HistoryPage
+                }}
+              }}
+            }}
+          }}
+        }}"""
+        for index in range(size)
+    )
+    return register(
+        f"""
+        query HistoryBatch($author: ID{variables}) {{
+          {selections}
+        }}
+        """
+    )
@@ -2,18 +2,50 @@
 
 from __future__ import annotations
 
-import calendar
-from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+import bisect
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Optional
 
 import requests
 from fastapi import HTTPException
+from api.controllers import github_queries
 from config.env import Environment
+from services.cache import cached
+from services.circuit_breaker import upstream_call
+from services.cohort import cohort_index
+from services.deadline import DeadlineExceeded, deadline_expired, upstream_timeout
+from services.jobs import report_progress
+from services.negative_cache import reject_missing_logins
+from services.rate_limit import rate_limits
+from services.sampling import month_strata, stratified_summary
+from services.snapshots import ContributionView, Day, Window, contribution_snapshots
+from telemetry import instrumentation
+from utils.fields import FieldSelection, wants
 
 GITHUB_BASE_URL = Environment.GITHUB_BASE_URL
 GITHUB_TOKEN = Environment.GITHUB_TOKEN
 DEFAULT_START_DATE = Environment.START_DATE or "2025-01-01"
 DEFAULT_END_DATE = Environment.END_DATE or "2025-12-31"
+# GitHub's cap on commitContributionsByRepository.
+MAX_REPOSITORIES = 100
+HISTORY_PAGE_SIZE = 100
+# Per batched history request: aliased repository selections, and the total
+# of their `first` arguments (GitHub charges cost and node limits on these).
+HISTORY_BATCH_MAX_ALIASES = 25
+HISTORY_BATCH_MAX_NODES = 1000
+HISTORY_WORKERS = 4
+# Response field -> contributionsCollection field it is read from.
+YEAR_SUMMARY_FIELDS = {
+    "commits": "totalCommitContributions",
+    "issues": "totalIssueContributions",
+    "pull_requests": "totalPullRequestContributions",
+    "reviews": "totalPullRequestReviewContributions",
+}
+# GitHub's calendar palette, from no contributions to the top quartile.
+CALENDAR_COLORS = ("#ebedf0", "#9be9a8", "#40c463", "#30a14e", "#216e39")
 
 
 def _normalize_datetime(value: str, default_time: str) -> str:
@@ -35,28 +67,78 @@ def _build_headers(accept: str | None = None) -> Dict[str, str]:
 def _get(path: str, params: Dict[str, Any], accept: str | None = None) -> Dict[str, Any]:
     """Call GitHub API and return the parsed JSON response."""
     url = f"{GITHUB_BASE_URL}{path}"
-    response = requests.get(url, headers=_build_headers(accept), params=params, timeout=30)
+    sampled = instrumentation.is_sampled()
+    timeout = upstream_timeout()
+    with upstream_call("rest") as call:
+        started = time.perf_counter()
+        try:
+            response = requests.get(
+                url, headers=_build_headers(accept), params=params, timeout=timeout
+            )
+        except requests.Timeout:
+            if deadline_expired():
+                raise DeadlineExceeded()
+            raise
+        call.status = response.status_code
+    rate_limits.update(response.headers)
+    if sampled:
+        instrumentation.record_upstream(
+            "rest", time.perf_counter() - started, response.status_code, len(response.content)
+        )
     if not response.ok:
         detail = response.json() if response.content else {"message": "GitHub API error"}
         raise HTTPException(status_code=response.status_code, detail=detail)
     return response.json()
 
 
-def _post_graphql(query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
-    """Call GitHub GraphQL API and return the parsed JSON response."""
-    response = requests.post(
-        f"{GITHUB_BASE_URL}/graphql",
-        headers=_build_headers(),
-        json={"query": query, "variables": variables},
-        timeout=30,
-    )
+def _graphql_error_status(errors: list[Dict[str, Any]]) -> int:
+    """404 when the queried user does not exist, 400 for any other GraphQL error."""
+    for error in errors:
+        if error.get("type") == "NOT_FOUND" and (error.get("path") or [None])[0] == "user":
+            return 404
+    return 400
+
+
+def _post_graphql(document_id: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a registered GraphQL document and return the parsed ``data``."""
+    document = github_queries.document(document_id)
+    sampled = instrumentation.is_sampled()
+    query = document.text_with_cost if sampled else document.text
+    timeout = upstream_timeout()
+    with upstream_call("graphql") as call:
+        started = time.perf_counter()
+        try:
+            response = requests.post(
+                f"{GITHUB_BASE_URL}/graphql",
+                headers=_build_headers(),
+                json={"query": query, "variables": variables, "operationName": document.name},
+                timeout=timeout,
+            )
+        except requests.Timeout:
+            if deadline_expired():
+                raise DeadlineExceeded()
+            raise
+        call.status = response.status_code
+    elapsed = time.perf_counter() - started
+    rate_limits.update(response.headers)
     if not response.ok:
+        if sampled:
+            instrumentation.record_upstream(
+                "graphql", elapsed, response.status_code, len(response.content)
+            )
         detail = response.json() if response.content else {"message": "GitHub API error"}
         raise HTTPException(status_code=response.status_code, detail=detail)
     payload = response.json()
-    if payload.get("errors"):
-        raise HTTPException(status_code=400, detail=payload["errors"])
-    return payload["data"]
+    data = payload.get("data") or {}
+    if sampled:
+        cost = (data.pop("rateLimit", None) or {}).get("cost") or 0
+        instrumentation.record_upstream(
+            "graphql", elapsed, response.status_code, len(response.content), cost
+        )
+    errors = payload.get("errors")
+    if errors:
+        raise HTTPException(status_code=_graphql_error_status(errors), detail=errors)
+    return data
 
 
 def _parse_github_datetime(value: str) -> Optional[datetime]:
@@ -106,6 +188,136 @@ def _percentile(sorted_values: list[int], percentile: float) -> int:
     return int(sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight)
 
 
+def _map_concurrently(
+    func: Callable[[Any], Any], items: Iterable[Any], max_workers: int
+) -> list[Any]:
+    """Map ``func`` over ``items`` in threads that keep the caller's context."""
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, func, item) for item in items
+        ]
+        return [future.result() for future in futures]
+
+
+class _HistoryCursor:
+    """Paging state for one repo's commit history within a time window."""
+
+    __slots__ = ("repo", "owner", "name", "since", "until", "cap", "sizes", "total", "after", "has_more", "done")
+
+    def __init__(self, repo: str, since: str, until: str, cap: int):
+        self.repo = repo
+        self.owner, self.name = repo.split("/", 1)
+        self.since = since
+        self.until = until
+        self.cap = cap
+        self.sizes: list[int] = []
+        self.total = 0
+        self.after: Optional[str] = None
+        self.has_more = False
+        self.done = False
+
+    @property
+    def page_size(self) -> int:
+        return min(HISTORY_PAGE_SIZE, self.cap - len(self.sizes))
+
+
+def _pack_history_batches(cursors: list[_HistoryCursor]) -> list[list[_HistoryCursor]]:
+    """Group cursors into batches that stay within the alias and node budgets."""
+    batches: list[list[_HistoryCursor]] = []
+    batch: list[_HistoryCursor] = []
+    nodes = 0
+    for cursor in cursors:
+        if batch and (
+            len(batch) >= HISTORY_BATCH_MAX_ALIASES
+            or nodes + cursor.page_size > HISTORY_BATCH_MAX_NODES
+        ):
+            batches.append(batch)
+            batch, nodes = [], 0
+        batch.append(cursor)
+        nodes += cursor.page_size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _fetch_history_batch(
+    batch: list[_HistoryCursor], author: Optional[str], with_total: bool
+) -> bool:
+    """Advance every cursor in ``batch`` by one page; False if the deadline ran out."""
+    variables: Dict[str, Any] = {"author": author}
+    for index, cursor in enumerate(batch):
+        variables[f"owner{index}"] = cursor.owner
+        variables[f"name{index}"] = cursor.name
+        variables[f"first{index}"] = cursor.page_size
+        variables[f"after{index}"] = cursor.after
+        variables[f"since{index}"] = cursor.since
+        variables[f"until{index}"] = cursor.until
+    try:
+        data = _post_graphql(github_queries.history_batch(len(batch), with_total), variables)
+    except DeadlineExceeded:
+        return False
+    for index, cursor in enumerate(batch):
+        history = (
+            (((data.get(f"r{index}") or {}).get("defaultBranchRef") or {}).get("target") or {})
+            .get("history")
+            or {}
+        )
+        nodes = history.get("nodes") or []
+        cursor.total = int(history.get("totalCount") or 0)
+        for node in nodes[: cursor.cap - len(cursor.sizes)]:
+            cursor.sizes.append(int(node.get("additions", 0)) + int(node.get("deletions", 0)))
+        page_info = history.get("pageInfo") or {}
+        cursor.has_more = bool(nodes) and bool(page_info.get("hasNextPage"))
+        cursor.after = page_info.get("endCursor")
+        cursor.done = not cursor.has_more or len(cursor.sizes) >= cursor.cap
+    return True
+
+
+def _collect_histories(
+    cursors: list[_HistoryCursor], author: Optional[str], with_total: bool = False
+) -> bool:
+    """
+    Page through all cursors, several repos per request, until each is
+    exhausted or capped. Returns True if the request deadline cut it short.
+    """
+    pending = list(cursors)
+    _report_history_progress(cursors, pending)
+    while pending:
+        if deadline_expired():
+            return True
+        completed = _map_concurrently(
+            lambda batch: _fetch_history_batch(batch, author, with_total),
+            _pack_history_batches(pending),
+            HISTORY_WORKERS,
+        )
+        if not all(completed):
+            return True
+        pending = [cursor for cursor in pending if not cursor.done]
+        _report_history_progress(cursors, pending)
+    return False
+
+
+def _report_history_progress(cursors: list[_HistoryCursor], pending: list[_HistoryCursor]) -> None:
+    """Progress for a commit-size job: repos whose history is complete, commits read."""
+    repos = {cursor.repo for cursor in cursors}
+    report_progress(
+        repos_total=len(repos),
+        repos_done=len(repos - {cursor.repo for cursor in pending}),
+        commits_processed=sum(len(cursor.sizes) for cursor in cursors),
+    )
+
+
+def _observe_commit_size(
+    username: str, since: str, until: str, stats: Dict[str, Any], truncated: bool
+) -> None:
+    # Partial or empty results would skew the cohort's medians.
+    if stats["count"] and not truncated:
+        cohort_index.observe(username, since, until, commit_size_median=stats["median"])
+
+
 def _build_commit_size_story(stats: Dict[str, Any]) -> str:
     if stats["count"] == 0:
         return "No commits found in the selected window."
@@ -127,6 +339,9 @@ def _build_commit_size_story(stats: Dict[str, Any]) -> str:
     return f"{tone} {tail}"
 
 
+@reject_missing_logins
+@cached
+@instrumentation.operation
 def fetch_repo_focus_and_collaboration(
     username: str,
     since: str,
@@ -135,24 +350,25 @@ def fetch_repo_focus_and_collaboration(
     max_pages: int,
     top_n: int,
     max_workers: int,
+    fields: Optional[FieldSelection] = None,
 ) -> Dict[str, Any]:
-    """Return top repos by commits and distinct repo count for a date range."""
+    """
+    Return top repos by commits and distinct repo count for a date range.
+    ``incomplete_results`` is set when GitHub's repository cap was reached,
+    so repos beyond it are missing from the counts.
+    """
     since_dt = _normalize_datetime(since, "T00:00:00Z")
     until_dt = _normalize_datetime(until, "T23:59:59Z")
-    query = """
-    query($login: String!, $from: DateTime!, $to: DateTime!) {
-      user(login: $login) {
-        contributionsCollection(from: $from, to: $to) {
-          totalCommitContributions
-          commitContributionsByRepository(maxRepositories: 100) {
-            repository { nameWithOwner }
-            contributions { totalCount }
-          }
-        }
-      }
-    }
-    """
-    data = _post_graphql(query, {"login": username, "from": since_dt, "to": until_dt})
+    with_total = wants(fields, "total_commits")
+    with_repos = any(
+        wants(fields, name) for name in ("unique_repos", "top_repos", "incomplete_results")
+    )
+    data: Dict[str, Any] = {}
+    if with_total or with_repos:
+        data = _post_graphql(
+            github_queries.repo_focus(with_total, with_repos),
+            {"login": username, "from": since_dt, "to": until_dt},
+        )
     collection = (
         data.get("user", {}).get("contributionsCollection", {}) if data else {}
     )
@@ -182,37 +398,31 @@ def fetch_repo_focus_and_collaboration(
         "per_page": per_page,
         "max_pages": max_pages,
         "max_workers": max_workers,
-        "incomplete_results": False,
+        "incomplete_results": len(repos) >= MAX_REPOSITORIES,
         "truncated": False,
     }
 
 
-def fetch_commit_count_monthly_2025(username: str) -> Dict[str, Any]:
+@reject_missing_logins
+@cached
+@instrumentation.operation
+def fetch_commit_count_monthly_2025(
+    username: str, fields: Optional[FieldSelection] = None
+) -> Dict[str, Any]:
     """Return commit counts per month for 2025 for a user."""
     year_str = DEFAULT_START_DATE.split("T", 1)[0].split("-", 1)[0]
     year = int(year_str) if year_str.isdigit() else 2025
-    month_aliases = []
-    for month in range(1, 13):
-        last_day = calendar.monthrange(year, month)[1]
-        since = f"{year}-{month:02d}-01T00:00:00Z"
-        until = f"{year}-{month:02d}-{last_day:02d}T23:59:59Z"
-        alias = f"m{month:02d}"
-        month_aliases.append(
-            f"""{alias}: contributionsCollection(from: "{since}", to: "{until}") {{
-              totalCommitContributions
-            }}"""
-        )
-    query = f"""
-    query($login: String!) {{
-      user(login: $login) {{
-        {" ".join(month_aliases)}
-      }}
-    }}
-    """
-    data = _post_graphql(query, {"login": username})
+    months = tuple(
+        month
+        for month in range(1, 13)
+        if wants(fields, f"monthly_counts.{year}-{month:02d}")
+    )
+    data: Dict[str, Any] = {}
+    if months:
+        data = _post_graphql(github_queries.commit_count_monthly(year, months), {"login": username})
     user = data.get("user", {}) if data else {}
     monthly_counts = {}
-    for month in range(1, 13):
+    for month in months:
         alias = f"m{month:02d}"
         monthly_counts[f"{year}-{month:02d}"] = (
             user.get(alias, {}).get("totalCommitContributions", 0)
@@ -226,35 +436,35 @@ def fetch_commit_count_monthly_2025(username: str) -> Dict[str, Any]:
     }
 
 
+@reject_missing_logins
+@cached
+@instrumentation.operation
 def fetch_commit_size_distribution(
     username: str,
     since: str,
     until: str,
     top_repos: int,
     max_commits_per_repo: int,
+    sampling: str = "newest",
+    per_stratum: int = 10,
 ) -> Dict[str, Any]:
-    """Return commit size distribution and a short narrative."""
+    """
+    Return commit size distribution and a short narrative.
+    If the request deadline runs out between history batches, the stats
+    cover the commits fetched so far and ``truncated`` is set.
+
+    History pages for several repos are fetched in one aliased query.
+
+    ``sampling="stratified"`` replaces the newest-commits walk with
+    ``per_stratum`` commits from each repo-month and reports reweighted
+    estimates with 95% confidence intervals.
+    """
     since_dt = _normalize_datetime(since, "T00:00:00Z")
     until_dt = _normalize_datetime(until, "T23:59:59Z")
 
-    user_query = """
-    query($login: String!, $from: DateTime!, $to: DateTime!) {
-      user(login: $login) {
-        id
-        contributionsCollection(from: $from, to: $to) {
-          commitContributionsByRepository(maxRepositories: 100) {
-            repository {
-              nameWithOwner
-              defaultBranchRef { name }
-            }
-            contributions { totalCount }
-          }
-        }
-      }
-    }
-    """
     user_data = _post_graphql(
-        user_query, {"login": username, "from": since_dt, "to": until_dt}
+        github_queries.COMMIT_SIZE_REPOSITORIES,
+        {"login": username, "from": since_dt, "to": until_dt},
     )
     user = user_data.get("user", {}) if user_data else {}
     user_id = user.get("id")
@@ -265,9 +475,6 @@ def fetch_commit_size_distribution(
         (
             {
                 "repo": repo.get("repository", {}).get("nameWithOwner"),
-                "default_branch": repo.get("repository", {})
-                .get("defaultBranchRef", {})
-                .get("name"),
                 "commit_count": repo.get("contributions", {}).get("totalCount", 0),
             }
             for repo in repos
@@ -277,81 +484,79 @@ def fetch_commit_size_distribution(
         reverse=True,
     )[:top_repos]
 
-    history_query = """
-    query(
-      $repo_owner: String!,
-      $repo_name: String!,
-      $from: GitTimestamp,
-      $until: GitTimestamp,
-      $author: ID,
-      $after: String
-    ) {
-      repository(owner: $repo_owner, name: $repo_name) {
-        defaultBranchRef {
-          target {
-            ... on Commit {
-              history(first: 100, since: $from, until: $until, author: {id: $author}, after: $after) {
-                nodes {
-                  additions
-                  deletions
-                  changedFiles
-                  committedDate
-                }
-                pageInfo {
-                  hasNextPage
-                  endCursor
-                }
-              }
-            }
-          }
+    repo_names = [
+        entry["repo"] for entry in ranked_repos if entry["repo"] and "/" in entry["repo"]
+    ]
+
+    if sampling == "stratified":
+        strata = month_strata(since_dt, until_dt)
+        cursors = [
+            _HistoryCursor(repo_full, stratum_since, stratum_until, per_stratum)
+            for repo_full in repo_names
+            for stratum_since, stratum_until in strata
+        ]
+        truncated = _collect_histories(cursors, user_id, with_total=True)
+        per_repo_counts: dict[str, int] = {}
+        pooled: list[tuple[int, list[int]]] = []
+        for cursor in cursors:
+            if cursor.sizes:
+                pooled.append((cursor.total, cursor.sizes))
+                per_repo_counts[cursor.repo] = per_repo_counts.get(cursor.repo, 0) + len(cursor.sizes)
+        summary = stratified_summary(pooled)
+        percentiles = summary["percentiles"]
+        stats = {
+            "count": summary["population"],
+            "min": summary.get("min", 0),
+            "max": summary.get("max", 0),
+            "median": percentiles.get(50, 0),
+            "p75": percentiles.get(75, 0),
+            "p90": percentiles.get(90, 0),
+            "p95": percentiles.get(95, 0),
+            "average": summary["mean"],
+        }
+        _observe_commit_size(username, since, until, stats, truncated)
+        repos_processed = len(
+            {cursor.repo for cursor in cursors}
+            - {cursor.repo for cursor in cursors if not cursor.done}
+        )
+        return {
+            "username": username,
+            "since": since,
+            "until": until,
+            "top_repos": top_repos,
+            "max_commits_per_repo": max_commits_per_repo,
+            "stats": stats,
+            "confidence_intervals": summary["intervals"],
+            "sampling": {
+                "mode": "stratified",
+                "strata": sum(1 for cursor in cursors if cursor.total),
+                "per_stratum": per_stratum,
+                "sampled_commits": summary["sampled"],
+                "population_commits": summary["population"],
+                "confidence": 0.95,
+            },
+            "per_repo_commit_counts": per_repo_counts,
+            "story": _build_commit_size_story(stats),
+            "source": "graphql",
+            "repos_processed": repos_processed,
+            "commits_processed": summary["sampled"],
+            "incomplete_results": truncated,
+            "truncated": truncated,
         }
-      }
-    }
-    """
 
+    cursors = [
+        _HistoryCursor(repo_full, since_dt, until_dt, max_commits_per_repo)
+        for repo_full in repo_names
+    ]
+    truncated = _collect_histories(cursors, user_id)
     sizes: list[int] = []
-    per_repo_counts: dict[str, int] = {}
-    for repo_entry in ranked_repos:
-        repo_full = repo_entry["repo"]
-        if not repo_full or "/" not in repo_full:
-            continue
-        owner, name = repo_full.split("/", 1)
-        collected = 0
-        after = None
-        while collected < max_commits_per_repo:
-            data = _post_graphql(
-                history_query,
-                {
-                    "repo_owner": owner,
-                    "repo_name": name,
-                    "from": since_dt,
-                    "until": until_dt,
-                    "author": user_id,
-                    "after": after,
-                },
-            )
-            history = (
-                data.get("repository", {})
-                .get("defaultBranchRef", {})
-                .get("target", {})
-                .get("history", {})
-            )
-            nodes = history.get("nodes", []) if history else []
-            if not nodes:
-                break
-            for node in nodes:
-                if collected >= max_commits_per_repo:
-                    break
-                additions = int(node.get("additions", 0))
-                deletions = int(node.get("deletions", 0))
-                sizes.append(additions + deletions)
-                collected += 1
-            page_info = history.get("pageInfo", {})
-            if not page_info.get("hasNextPage"):
-                break
-            after = page_info.get("endCursor")
-        if collected:
-            per_repo_counts[repo_full] = collected
+    per_repo_counts = {}
+    for cursor in cursors:
+        sizes.extend(cursor.sizes)
+        if cursor.sizes:
+            per_repo_counts[cursor.repo] = len(cursor.sizes)
+    repos_processed = sum(1 for cursor in cursors if cursor.done)
+    capped_repos = sum(1 for cursor in cursors if cursor.done and cursor.has_more)
 
     sizes.sort()
     count = len(sizes)
@@ -365,6 +570,7 @@ def fetch_commit_size_distribution(
         "p95": _percentile(sizes, 95),
         "average": round(sum(sizes) / count, 2) if count else 0,
     }
+    _observe_commit_size(username, since, until, stats, truncated)
 
     return {
         "username": username,
@@ -376,15 +582,23 @@ def fetch_commit_size_distribution(
         "per_repo_commit_counts": per_repo_counts,
         "story": _build_commit_size_story(stats),
         "source": "graphql",
+        "repos_processed": repos_processed,
+        "commits_processed": count,
+        "incomplete_results": truncated or capped_repos > 0,
+        "truncated": truncated,
     }
 
 
+@reject_missing_logins
+@cached
+@instrumentation.operation
 def fetch_most_used_languages(
     username: str,
     since: str,
     until: str,
     per_page: int,
     page: int,
+    fields: Optional[FieldSelection] = None,
 ) -> Dict[str, Any]:
     """
     Aggregate language usage for repos contributed to within a date range.
@@ -393,26 +607,13 @@ def fetch_most_used_languages(
     since_dt = _normalize_datetime(since, "T00:00:00Z")
     until_dt = _normalize_datetime(until, "T23:59:59Z")
 
-    query = """
-    query($login: String!, $from: DateTime!, $to: DateTime!) {
-      user(login: $login) {
-        contributionsCollection(from: $from, to: $to) {
-          commitContributionsByRepository(maxRepositories: 100) {
-            repository {
-              nameWithOwner
-              languages(first: 20, orderBy: {field: SIZE, direction: DESC}) {
-                edges {
-                  size
-                  node { name }
-                }
-              }
-            }
-          }
-        }
-      }
-    }
-    """
-    data = _post_graphql(query, {"login": username, "from": since_dt, "to": until_dt})
+    with_names = wants(fields, "languages") or wants(fields, "percentages")
+    data: Dict[str, Any] = {}
+    if with_names or wants(fields, "total_bytes"):
+        data = _post_graphql(
+            github_queries.languages(with_names),
+            {"login": username, "from": since_dt, "to": until_dt},
+        )
     repos = (
         data.get("user", {})
         .get("contributionsCollection", {})
@@ -420,16 +621,18 @@ def fetch_most_used_languages(
     )
 
     language_totals: dict[str, int] = {}
+    total_bytes = 0
     for repo in repos:
         edges = repo.get("repository", {}).get("languages", {}).get("edges", [])
         for edge in edges:
-            language = edge.get("node", {}).get("name")
             bytes_count = edge.get("size", 0)
-            if not language:
-                continue
-            language_totals[language] = language_totals.get(language, 0) + bytes_count
+            if with_names:
+                language = edge.get("node", {}).get("name")
+                if not language:
+                    continue
+                language_totals[language] = language_totals.get(language, 0) + bytes_count
+            total_bytes += bytes_count
 
-    total_bytes = sum(language_totals.values())
     percentages: dict[str, float] = {}
     if total_bytes > 0:
         for language, bytes_count in language_totals.items():
@@ -448,6 +651,9 @@ def fetch_most_used_languages(
     }
 
 
+@reject_missing_logins
+@cached
+@instrumentation.operation
 def fetch_repo_count(
     username: str,
     per_page: int,
@@ -463,6 +669,9 @@ def fetch_repo_count(
     }
 
 
+@reject_missing_logins
+@cached
+@instrumentation.operation
 def fetch_user_summary(username: str) -> Dict[str, Any]:
     """Return a summary of public user profile stats."""
     response = _get(f"/users/{username}", {})
@@ -483,6 +692,7 @@ def fetch_user_summary(username: str) -> Dict[str, Any]:
     }
 
 
+@instrumentation.operation
 def fetch_rate_limit() -> Dict[str, Any]:
     """Return current rate limit status for the authenticated token."""
     response = _get("/rate_limit", {})
@@ -494,6 +704,9 @@ def fetch_rate_limit() -> Dict[str, Any]:
     }
 
 
+@reject_missing_logins
+@cached
+@instrumentation.operation
 def fetch_top_languages_by_repo_stars(
     username: str,
     per_page: int,
@@ -534,31 +747,130 @@ def fetch_top_languages_by_repo_stars(
     }
 
 
+def _whole_days(since_dt: str, until_dt: str) -> Optional[Window]:
+    """The first and last day of a window made of whole UTC days, else None."""
+    if not (since_dt.endswith("T00:00:00Z") and until_dt.endswith("T23:59:59Z")):
+        return None
+    try:
+        return date.fromisoformat(since_dt[:10]), date.fromisoformat(until_dt[:10])
+    except ValueError:
+        return None
+
+
+def _calendar_days(collection: Dict[str, Any]) -> list[Day]:
+    return [
+        (date.fromisoformat(day["date"]), day.get("contributionCount", 0))
+        for week in collection.get("contributionCalendar", {}).get("weeks", [])
+        for day in week.get("contributionDays", [])
+    ]
+
+
+def _contribution_view(
+    username: str, kind: str, since_dt: str, until_dt: str
+) -> Optional[ContributionView]:
+    """
+    Daily contribution counts (``calendar``) or totals (``totals``) from the
+    user's snapshot, fetching only the days it does not hold yet. None when
+    snapshots are disabled or the window does not cover whole days.
+    """
+    window = _whole_days(since_dt, until_dt)
+    if window is None or not contribution_snapshots.enabled:
+        return None
+
+    def fetch(closed: Optional[Window], open_: Optional[Window]) -> tuple:
+        windows = {"closed": closed, "open": open_}
+        variables: Dict[str, Any] = {"login": username}
+        for alias, span in windows.items():
+            if span is not None:
+                variables[f"{alias}From"] = f"{span[0].isoformat()}T00:00:00Z"
+                variables[f"{alias}To"] = f"{span[1].isoformat()}T23:59:59Z"
+        data = _post_graphql(
+            github_queries.contribution_window(closed is not None, open_ is not None, kind),
+            variables,
+        )
+        user = data.get("user") or {}
+        return tuple(
+            _window_data(user[alias]) if windows[alias] is not None and user.get(alias) else None
+            for alias in ("closed", "open")
+        )
+
+    return contribution_snapshots.view(username, kind, window[0], window[1], fetch)
+
+
+def _window_data(collection: Dict[str, Any]) -> tuple:
+    totals = {
+        field: collection[field]
+        for field in github_queries.CONTRIBUTION_TOTAL_FIELDS
+        if field in collection
+    }
+    return _calendar_days(collection), totals
+
+
+def _calendar_colors(days: list[Day]) -> list[str]:
+    """
+    Per-day colors as GitHub assigns them: no contributions, else the
+    quartile of the day's count among the calendar's non-zero days.
+    """
+    active = sorted(count for _, count in days if count)
+    if not active:
+        return [CALENDAR_COLORS[0]] * len(days)
+    cuts = [active[(len(active) - 1) * quarter // 4] for quarter in (1, 2, 3)]
+    return [
+        CALENDAR_COLORS[1 + bisect.bisect_left(cuts, count)] if count else CALENDAR_COLORS[0]
+        for _, count in days
+    ]
+
+
+def _calendar_weeks(days: list[Day], day_fields: tuple[str, ...]) -> list[Dict[str, Any]]:
+    # GitHub calendar weeks start on Sunday.
+    colors = _calendar_colors(days) if "color" in day_fields else None
+    weeks: list[Dict[str, Any]] = []
+    for index, (day, count) in enumerate(days):
+        if not weeks or day.weekday() == 6:
+            weeks.append({"contributionDays": []})
+        values = {"date": day.isoformat(), "contributionCount": count}
+        if colors is not None:
+            values["color"] = colors[index]
+        weeks[-1]["contributionDays"].append({field: values[field] for field in day_fields})
+    return weeks
+
+
+@reject_missing_logins
+@cached
+@instrumentation.operation
 def fetch_year_summary_cards(
     username: str,
     since: str,
     until: str,
+    fields: Optional[FieldSelection] = None,
 ) -> Dict[str, Any]:
     """Return year summary totals for commits, issues, PRs, and reviews."""
     since_dt = _normalize_datetime(since, "T00:00:00Z")
     until_dt = _normalize_datetime(until, "T23:59:59Z")
 
-    query = """
-    query($login: String!, $from: DateTime!, $to: DateTime!) {
-      user(login: $login) {
-        contributionsCollection(from: $from, to: $to) {
-          totalCommitContributions
-          totalIssueContributions
-          totalPullRequestContributions
-          totalPullRequestReviewContributions
-        }
-      }
-    }
-    """
-    data = _post_graphql(query, {"login": username, "from": since_dt, "to": until_dt})
+    selection = tuple(
+        field for name, field in YEAR_SUMMARY_FIELDS.items() if wants(fields, name)
+    )
+    # Snapshots sum every total: used when all of them are wanted, while a
+    # narrower selection keeps its pruned single query.
+    view = (
+        _contribution_view(username, "totals", since_dt, until_dt)
+        if set(selection) == set(github_queries.CONTRIBUTION_TOTAL_FIELDS)
+        else None
+    )
+    data: Dict[str, Any] = {}
+    if selection and view is None:
+        data = _post_graphql(
+            github_queries.year_summary(selection),
+            {"login": username, "from": since_dt, "to": until_dt},
+        )
     collection = (
         data.get("user", {}).get("contributionsCollection", {}) if data else {}
     )
+    if view is not None:
+        collection = view.totals
+    if "totalCommitContributions" in selection:
+        cohort_index.observe(username, since, until, commits=collection.get("totalCommitContributions", 0))
     return {
         "username": username,
         "since": since,
@@ -571,39 +883,54 @@ def fetch_year_summary_cards(
     }
 
 
+@reject_missing_logins
+@cached
+@instrumentation.operation
 def fetch_contribution_heatmap(
     username: str,
     since: str,
     until: str,
+    fields: Optional[FieldSelection] = None,
 ) -> Dict[str, Any]:
     """Return contribution calendar heatmap for a date range."""
     since_dt = _normalize_datetime(since, "T00:00:00Z")
     until_dt = _normalize_datetime(until, "T23:59:59Z")
 
-    query = """
-    query($login: String!, $from: DateTime!, $to: DateTime!) {
-      user(login: $login) {
-        contributionsCollection(from: $from, to: $to) {
-          contributionCalendar {
-            totalContributions
-            weeks {
-              contributionDays {
-                date
-                contributionCount
-                color
-              }
-            }
-          }
-        }
-      }
-    }
-    """
-    data = _post_graphql(query, {"login": username, "from": since_dt, "to": until_dt})
+    with_total = wants(fields, "total_contributions")
+    day_fields = tuple(
+        field
+        for field in github_queries.CALENDAR_DAY_FIELDS
+        if wants(fields, f"weeks.contributionDays.{field}")
+    )
+    # Snapshots hold counts, and colors are derived from the merged counts:
+    # used whenever days are wanted (a totals-only query is cheaper).
+    view = _contribution_view(username, "calendar", since_dt, until_dt) if day_fields else None
+    data: Dict[str, Any] = {}
+    if (with_total or day_fields) and view is None:
+        data = _post_graphql(
+            github_queries.contribution_heatmap(with_total, day_fields),
+            {"login": username, "from": since_dt, "to": until_dt},
+        )
     calendar_data = (
         data.get("user", {})
         .get("contributionsCollection", {})
         .get("contributionCalendar", {})
     )
+    if view is not None:
+        calendar_data = {
+            "totalContributions": sum(count for _, count in view.days),
+            "weeks": _calendar_weeks(view.days, day_fields),
+        }
+    if view is not None:
+        cohort_index.observe(username, since, until, active_days=sum(1 for _, count in view.days if count))
+    elif "contributionCount" in day_fields:
+        active_days = sum(
+            1
+            for week in calendar_data.get("weeks", [])
+            for day in week.get("contributionDays", [])
+            if day.get("contributionCount")
+        )
+        cohort_index.observe(username, since, until, active_days=active_days)
 
     return {
         "username": username,
@@ -613,3 +940,40 @@ def fetch_contribution_heatmap(
         "weeks": calendar_data.get("weeks", []),
         "source": "graphql",
     }
+
+
+@reject_missing_logins
+@instrumentation.operation
+def fetch_cohort_rank(
+    username: str,
+    since: str,
+    until: str,
+    histogram_bins: int = 0,
+) -> Dict[str, Any]:
+    """
+    Return the user's percentile rank against every recap computed for the
+    same window. Year totals and active days are computed first if the
+    user has none yet; the commit-size median is ranked once a
+    commit-size distribution has been computed for them.
+    """
+    ranks = cohort_index.rank(username, since, until, histogram_bins)
+    if "commits" not in ranks or "active_days" not in ranks:
+        # Observed here as well: cached results do not reach the index again,
+        # e.g. after the window's cohort was evicted.
+        summary = fetch_year_summary_cards(username=username, since=since, until=until)
+        heatmap = fetch_contribution_heatmap(username=username, since=since, until=until)
+        active_days = sum(
+            1
+            for week in heatmap["weeks"]
+            for day in week.get("contributionDays", [])
+            if day.get("contributionCount")
+        )
+        cohort_index.observe(username, since, until, commits=summary["commits"], active_days=active_days)
+        ranks = cohort_index.rank(username, since, until, histogram_bins)
+    return {
+        "username": username,
+        "since": since,
+        "until": until,
+        "ranks": ranks,
+        "source": "cohort",
+    }
@@ -1,6 +1,8 @@
 """API router package."""
 
+from api.routers.admin_router import router as admin_router
 from api.routers.github_search_router import router as github_search_router
 from api.routers.health_router import router as health_router
+from api.routers.metrics_router import router as metrics_router
 
-__all__ = ["github_search_router", "health_router"]
+__all__ = ["admin_router", "github_search_router", "health_router", "metrics_router"]
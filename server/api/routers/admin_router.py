@@ -0,0 +1,86 @@
+"""Operator endpoints, enabled by setting ADMIN_TOKEN."""
+
+from __future__ import annotations
+
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+
+from config.env import Environment
+from services.circuit_breaker import upstream_guards
+from services.hot_keys import cache_warmer, hot_usernames
+from services.negative_cache import missing_logins
+from services.rate_limit import rate_limits
+from services.snapshots import contribution_snapshots
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not Environment.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail={"message": "Not Found"})
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, Environment.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail={"message": "Invalid admin token"})
+
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin_token)],
+    include_in_schema=False,
+)
+
+
+@router.get("/negative-cache")
+def fetch_negative_cache(limit: int = Query(100, ge=1, le=1000)):
+    """List logins currently rejected as missing."""
+    logins = missing_logins.logins()
+    return {
+        "entries": len(logins),
+        "ttl_seconds": missing_logins.ttl,
+        "logins": logins[-limit:],
+        "stats": dict(missing_logins.stats),
+    }
+
+
+@router.delete("/negative-cache/{login}")
+def invalidate_negative_cache_entry(login: str):
+    """Stop rejecting a login, e.g. after the account was created or restored."""
+    return {"login": login, "invalidated": missing_logins.invalidate(login)}
+
+
+@router.delete("/negative-cache")
+def clear_negative_cache():
+    """Forget every login recorded as missing."""
+    return {"invalidated": missing_logins.clear()}
+
+
+@router.delete("/snapshots/{login}")
+def invalidate_snapshots(login: str):
+    """Drop a login's contribution snapshots so its closed days are fetched again."""
+    return {"login": login, "invalidated": contribution_snapshots.invalidate(login)}
+
+
+@router.get("/hot-keys")
+def fetch_hot_keys(limit: int = Query(20, ge=1, le=500)):
+    """Most requested usernames, and how the cache warmer is doing."""
+    return {
+        "top": [
+            {"username": username, "count": round(count, 2), "error": round(error, 2)}
+            for username, count, error in hot_usernames.top(limit)
+        ],
+        "warmer": {
+            "enabled": cache_warmer.enabled,
+            "top_k": cache_warmer.top_k,
+            "interval_seconds": cache_warmer.interval,
+            "hit_rate": cache_warmer.hit_rate(),
+            "stats": dict(cache_warmer.stats),
+            "budget": cache_warmer.budget(),
+        },
+        "rate_limits": rate_limits.snapshot(),
+    }
+
+
+@router.get("/upstream")
+def fetch_upstream_guards():
+    """Circuit breaker state and concurrency limit per GitHub API."""
+    return {resource: guard.snapshot() for resource, guard in upstream_guards.items()}
@@ -2,43 +2,105 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Query
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
 
 from api.controllers import github_search_controller
 from config.env import Environment
+from services.hot_keys import track_username
+from services.jobs import job_manager
+from utils.fields import FieldSelection, select_fields
 
 DEFAULT_START_DATE = Environment.START_DATE
 DEFAULT_END_DATE = Environment.END_DATE
 
-router = APIRouter(prefix="/github/search", tags=["github-search"])
+router = APIRouter(
+    prefix="/github/search",
+    tags=["github-search"],
+    dependencies=[Depends(track_username)],
+)
+
+
+def _field_selection(
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated response fields to return; dotted paths select nested fields.",
+    ),
+) -> Optional[FieldSelection]:
+    return FieldSelection.parse(fields)
 
 
 @router.get("/commit-count-monthly-2025")
 def fetch_commit_count_monthly_2025(
     username: str = Query(..., min_length=1),
+    fields: Optional[FieldSelection] = Depends(_field_selection),
 ):
     """Fetch commit counts per month for 2025."""
-    return github_search_controller.fetch_commit_count_monthly_2025(
+    result = github_search_controller.fetch_commit_count_monthly_2025(
         username=username,
+        fields=fields,
     )
+    return select_fields(result, fields)
 
 
 @router.get("/commit-size-distribution")
 def fetch_commit_size_distribution(
+    request: Request,
     username: str = Query(..., min_length=1),
     since: str = Query(DEFAULT_START_DATE, min_length=1),
     until: str = Query(DEFAULT_END_DATE, min_length=1),
     top_repos: int = Query(5, ge=1, le=25),
     max_commits_per_repo: int = Query(250, ge=10, le=1000),
+    sampling: str = Query("newest", pattern="^(newest|stratified)$"),
+    per_stratum: int = Query(10, ge=1, le=100),
+    mode: str = Query("sync", pattern="^(sync|job)$"),
+    fields: Optional[FieldSelection] = Depends(_field_selection),
 ):
-    """Fetch commit size distribution and a short narrative."""
-    return github_search_controller.fetch_commit_size_distribution(
-        username=username,
-        since=since,
-        until=until,
-        top_repos=top_repos,
-        max_commits_per_repo=max_commits_per_repo,
-    )
+    """
+    Fetch commit size distribution and a short narrative.
+    With ``mode=job`` it runs in the background: poll the returned job.
+    Job mode answers 501 unless ``JOB_MODE_ENABLED`` is set.
+    """
+    params = {
+        "username": username,
+        "since": since,
+        "until": until,
+        "top_repos": top_repos,
+        "max_commits_per_repo": max_commits_per_repo,
+        "sampling": sampling,
+        "per_stratum": per_stratum,
+    }
+    if mode == "job":
+        job = job_manager.submit(
+            "commit-size-distribution",
+            github_search_controller.fetch_commit_size_distribution,
+            params,
+        )
+        location = str(request.url_for("fetch_job", job_id=job.id))
+        return JSONResponse(
+            status_code=202,
+            content={"id": job.id, "status": job.status, "location": location},
+            headers={"Location": location},
+        )
+    result = github_search_controller.fetch_commit_size_distribution(**params)
+    return select_fields(result, fields)
+
+
+@router.get("/jobs/{job_id}")
+def fetch_job(
+    job_id: str,
+    fields: Optional[FieldSelection] = Depends(_field_selection),
+):
+    """Fetch a background job's status and progress, and its result once done."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail={"message": "Job not found or expired"})
+    payload = job.describe()
+    if "result" in payload:
+        payload["result"] = select_fields(payload["result"], fields)
+    return payload
 
 
 @router.get("/repo-focus")
@@ -50,9 +112,10 @@ def fetch_repo_focus_and_collaboration(
     max_pages: int = Query(10, ge=1, le=10),
     max_workers: int = Query(8, ge=1, le=16),
     top_n: int = Query(10, ge=1, le=50),
+    fields: Optional[FieldSelection] = Depends(_field_selection),
 ):
     """Fetch top repos by commits and distinct repo count."""
-    return github_search_controller.fetch_repo_focus_and_collaboration(
+    result = github_search_controller.fetch_repo_focus_and_collaboration(
         username=username,
         since=since,
         until=until,
@@ -60,7 +123,9 @@ def fetch_repo_focus_and_collaboration(
         max_pages=max_pages,
         max_workers=max_workers,
         top_n=top_n,
+        fields=fields,
     )
+    return select_fields(result, fields)
 
 
 @router.get("/languages")
@@ -70,15 +135,18 @@ def fetch_languages(
     until: str = Query(DEFAULT_END_DATE, min_length=1),
     per_page: int = Query(100, ge=1, le=100),
     page: int = Query(1, ge=1),
+    fields: Optional[FieldSelection] = Depends(_field_selection),
 ):
     """Fetch repo languages within a date range."""
-    return github_search_controller.fetch_most_used_languages(
+    result = github_search_controller.fetch_most_used_languages(
         username=username,
         since=since,
         until=until,
         per_page=per_page,
         page=page,
+        fields=fields,
     )
+    return select_fields(result, fields)
 
 
 @router.get("/repo-count")
@@ -86,29 +154,36 @@ def fetch_repo_count(
     username: str = Query(..., min_length=1),
     per_page: int = Query(100, ge=1, le=100),
     page: int = Query(1, ge=1),
+    fields: Optional[FieldSelection] = Depends(_field_selection),
 ):
     """Fetch public repo count for a user."""
-    return github_search_controller.fetch_repo_count(
+    result = github_search_controller.fetch_repo_count(
         username=username,
         per_page=per_page,
         page=page,
     )
+    return select_fields(result, fields)
 
 
 @router.get("/user-summary")
 def fetch_user_summary(
     username: str = Query(..., min_length=1),
+    fields: Optional[FieldSelection] = Depends(_field_selection),
 ):
     """Fetch summary stats for a user."""
-    return github_search_controller.fetch_user_summary(
+    result = github_search_controller.fetch_user_summary(
         username=username,
     )
+    return select_fields(result, fields)
 
 
 @router.get("/rate-limit")
-def fetch_rate_limit():
+def fetch_rate_limit(
+    fields: Optional[FieldSelection] = Depends(_field_selection),
+):
     """Fetch current GitHub API rate limit status."""
-    return github_search_controller.fetch_rate_limit()
+    result = github_search_controller.fetch_rate_limit()
+    return select_fields(result, fields)
 
 
 @router.get("/top-languages-by-stars")
@@ -116,13 +191,15 @@ def fetch_top_languages_by_repo_stars(
     username: str = Query(..., min_length=1),
     per_page: int = Query(100, ge=1, le=100),
     page: int = Query(1, ge=1),
+    fields: Optional[FieldSelection] = Depends(_field_selection),
 ):
     """Fetch top languages weighted by repo stars."""
-    return github_search_controller.fetch_top_languages_by_repo_stars(
+    result = github_search_controller.fetch_top_languages_by_repo_stars(
         username=username,
         per_page=per_page,
         page=page,
     )
+    return select_fields(result, fields)
 
 
 @router.get("/year-summary")
@@ -130,13 +207,34 @@ def fetch_year_summary(
     username: str = Query(..., min_length=1),
     since: str = Query(DEFAULT_START_DATE, min_length=1),
     until: str = Query(DEFAULT_END_DATE, min_length=1),
+    fields: Optional[FieldSelection] = Depends(_field_selection),
 ):
     """Fetch year summary counts for commits, issues, PRs, and reviews."""
-    return github_search_controller.fetch_year_summary_cards(
+    result = github_search_controller.fetch_year_summary_cards(
+        username=username,
+        since=since,
+        until=until,
+        fields=fields,
+    )
+    return select_fields(result, fields)
+
+
+@router.get("/cohort-rank")
+def fetch_cohort_rank(
+    username: str = Query(..., min_length=1),
+    since: str = Query(DEFAULT_START_DATE, min_length=1),
+    until: str = Query(DEFAULT_END_DATE, min_length=1),
+    histogram_bins: int = Query(0, ge=0, le=100),
+    fields: Optional[FieldSelection] = Depends(_field_selection),
+):
+    """Fetch the user's percentile ranks against other recaps for the same window."""
+    result = github_search_controller.fetch_cohort_rank(
         username=username,
         since=since,
         until=until,
+        histogram_bins=histogram_bins,
     )
+    return select_fields(result, fields)
 
 
 @router.get("/contribution-heatmap")
@@ -144,10 +242,13 @@ def fetch_contribution_heatmap(
     username: str = Query(..., min_length=1),
     since: str = Query(DEFAULT_START_DATE, min_length=1),
     until: str = Query(DEFAULT_END_DATE, min_length=1),
+    fields: Optional[FieldSelection] = Depends(_field_selection),
 ):
     """Fetch contribution calendar heatmap for a date range."""
-    return github_search_controller.fetch_contribution_heatmap(
+    result = github_search_controller.fetch_contribution_heatmap(
         username=username,
         since=since,
         until=until,
+        fields=fields,
     )
+    return select_fields(result, fields)
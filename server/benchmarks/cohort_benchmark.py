@@ -0,0 +1,145 @@
+"""Rank-query latency and ingest rate of the cohort index.
+
+Fills one cohort with ``--users`` synthetic users (log-normal commit
+totals and commit-size medians, binomial active days) through the same
+``observe`` path the controllers use, then times percentile-rank queries
+for random users: right after a merge, and with a full delta of pending
+updates (the slowest point between merges). Also reports histogram
+queries and the cost of one merge.
+
+Usage (from ``server/``)::
+
+    python -m benchmarks.cohort_benchmark
+    python -m benchmarks.cohort_benchmark --users 100000 --queries 5000 --output cohort.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from services.cohort import METRICS, Cohort
+
+
+def _synthetic_metrics(rng: np.random.Generator, count: int) -> Dict[str, np.ndarray]:
+    return {
+        "commits": np.round(rng.lognormal(5.0, 1.2, count)),
+        "commit_size_median": np.round(rng.lognormal(3.5, 0.9, count)),
+        "active_days": rng.binomial(365, rng.beta(1.2, 3.0, count)).astype(np.float64),
+    }
+
+
+def _latency_us(func: Callable[[int], Any], indexes: np.ndarray) -> Dict[str, float]:
+    samples = np.empty(len(indexes))
+    for position, index in enumerate(indexes):
+        started = time.perf_counter_ns()
+        func(int(index))
+        samples[position] = time.perf_counter_ns() - started
+    samples /= 1000
+    return {
+        "p50_us": round(float(np.percentile(samples, 50)), 2),
+        "p99_us": round(float(np.percentile(samples, 99)), 2),
+        "max_us": round(float(samples.max()), 2),
+    }
+
+
+def _rank_all(cohort: Cohort, login: str) -> None:
+    for metric in METRICS:
+        cohort.rank(metric, cohort.value(login, metric))
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = np.random.default_rng(args.seed)
+    metrics = _synthetic_metrics(rng, args.users)
+    logins = [f"user-{index}" for index in range(args.users)]
+
+    cohort = Cohort()
+    started = time.perf_counter()
+    for index, login in enumerate(logins):
+        cohort.observe(login, {metric: metrics[metric][index] for metric in METRICS})
+    ingest_seconds = time.perf_counter() - started
+    print(f"ingested {args.users} users in {ingest_seconds:.1f} s", file=sys.stderr)
+
+    for column in cohort.columns.values():
+        column.merge()
+    queries = rng.integers(0, args.users, args.queries)
+    after_merge = _latency_us(lambda index: _rank_all(cohort, logins[index]), queries)
+
+    # Recompute users' recaps until just before the next merge.
+    column = cohort.columns["commits"]
+    pending = max(4096, len(column.main) // 64) // 2 - 1
+    updated = rng.integers(0, args.users, pending)
+    fresh = _synthetic_metrics(rng, pending)
+    for position, index in enumerate(updated):
+        cohort.observe(logins[index], {metric: fresh[metric][position] for metric in METRICS})
+    with_delta = _latency_us(lambda index: _rank_all(cohort, logins[index]), queries)
+    pending_entries = column.delta.size + column.tombstones.size
+
+    histogram = _latency_us(
+        lambda index: cohort.histogram("commits", cohort.value(logins[index], "commits"), args.bins),
+        queries[: max(args.queries // 10, 1)],
+    )
+    started = time.perf_counter()
+    column.merge()
+    merge_ms = (time.perf_counter() - started) * 1000
+
+    # Every rank must match a brute-force count over the column values.
+    values = cohort.values["commits"][: len(cohort.rows)]
+    for index in queries[:100]:
+        value = cohort.value(logins[int(index)], "commits")
+        expected = 100.0 * (np.count_nonzero(values < value) + 0.5 * np.count_nonzero(values == value)) / len(values)
+        assert abs(cohort.rank("commits", value)["percentile"] - round(expected, 2)) < 0.01
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "config": {"users": args.users, "queries": args.queries, "bins": args.bins, "seed": args.seed},
+        "ingest": {
+            "seconds": round(ingest_seconds, 2),
+            "users_per_second": round(args.users / ingest_seconds),
+        },
+        "rank_all_metrics_after_merge": after_merge,
+        "rank_all_metrics_with_delta": {**with_delta, "pending_entries": pending_entries},
+        "histogram": histogram,
+        "merge_ms": round(merge_ms, 2),
+    }
+    print(
+        f"rank ({len(METRICS)} metrics): p50 {after_merge['p50_us']} us, p99 {after_merge['p99_us']} us; "
+        f"with {pending_entries} pending: p50 {with_delta['p50_us']} us, p99 {with_delta['p99_us']} us; "
+        f"merge {merge_ms:.1f} ms",
+        file=sys.stderr,
+    )
+    return report
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=10_000)
+    parser.add_argument("--bins", type=int, default=20, help="Histogram buckets")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    args = parse_args(argv)
+    report = run(args)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(payload)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
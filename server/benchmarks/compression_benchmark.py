@@ -0,0 +1,135 @@
+"""CPU cost against bytes saved for response compression, per endpoint.
+
+Fetches one uncompressed response from each recap endpoint (in process,
+backed by ``benchmarks.fake_github``) and compresses it repeatedly at a
+range of gzip levels and brotli qualities. For each setting it reports
+the encoded size, the share of bytes saved and the CPU time per response,
+next to the cost of the digest that serves a stored variant on a cache
+hit instead.
+
+Usage (from ``server/``)::
+
+    python -m benchmarks.compression_benchmark
+    python -m benchmarks.compression_benchmark --username octocat --repeat 200 --output compression.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from benchmarks.fake_github import FakeGitHub
+from benchmarks.load_test import RECAP_ENDPOINTS, _build_client
+
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (1, 4, 5, 9, 11)
+
+
+def _settings() -> list[tuple[str, int]]:
+    from services.compression import brotli
+
+    settings = [("gzip", level) for level in GZIP_LEVELS]
+    if brotli is not None:
+        settings += [("br", quality) for quality in BROTLI_QUALITIES]
+    return settings
+
+
+def _cpu_microseconds(func: Callable[[], Any], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.thread_time_ns()
+        func()
+        samples.append(time.thread_time_ns() - started)
+    return round(statistics.median(samples) / 1000, 2)
+
+
+async def _fetch_bodies(username: str, github_url: str) -> Dict[str, bytes]:
+    client, _ = _build_client("inprocess", github_url)
+    bodies: Dict[str, bytes] = {}
+    async with client:
+        for path in RECAP_ENDPOINTS:
+            response = await client.get(
+                path, params={"username": username}, headers={"Accept-Encoding": "identity"}
+            )
+            response.raise_for_status()
+            bodies[path] = response.content
+    return bodies
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    with FakeGitHub() as fake:
+        bodies = asyncio.run(_fetch_bodies(args.username, fake.base_url))
+    # Imported only now: the app must load after _build_client has set its env.
+    from services.compression import compress, variant_key
+
+    endpoints = []
+    for path, body in bodies.items():
+        results = []
+        for encoding, level in _settings():
+            options = {"gzip_level": level} if encoding == "gzip" else {"brotli_quality": level}
+            encoded = compress(body, encoding, **options)
+            results.append({
+                "encoding": encoding,
+                "level": level,
+                "bytes": len(encoded),
+                "saved_ratio": round(1 - len(encoded) / len(body), 4) if body else 0,
+                "cpu_us": _cpu_microseconds(lambda: compress(body, encoding, **options), args.repeat),
+            })
+        endpoints.append({
+            "path": path,
+            "identity_bytes": len(body),
+            "cached_variant_cpu_us": _cpu_microseconds(lambda: variant_key(body, "gzip"), args.repeat),
+            "settings": results,
+        })
+        _print_endpoint(endpoints[-1])
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {"username": args.username, "repeat": args.repeat},
+        "endpoints": endpoints,
+    }
+
+
+def _print_endpoint(endpoint: Dict[str, Any]) -> None:
+    print(
+        f"{endpoint['path']}  {endpoint['identity_bytes']} B, "
+        f"cached variant {endpoint['cached_variant_cpu_us']} us",
+        file=sys.stderr,
+    )
+    for setting in endpoint["settings"]:
+        print(
+            f"  {setting['encoding']:<5}{setting['level']:<4}{setting['bytes']:>9} B  "
+            f"saved={setting['saved_ratio']:<7} cpu={setting['cpu_us']} us",
+            file=sys.stderr,
+        )
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--username", default="octocat")
+    parser.add_argument("--repeat", type=int, default=100, help="Compressions timed per setting")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    args = parse_args(argv)
+    report = run(args)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(payload)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,598 @@
+"""Local stand-in for the GitHub REST and GraphQL APIs.
+
+Serves deterministic, synthetic data for any login so the API can be
+exercised without network access or rate limits. Every value is derived
+from a hash of (login, day), which keeps totals, calendars and commit
+histories consistent with each other across overlapping date windows.
+
+GraphQL requests are executed by a small selection-set interpreter rather
+than matched on query text, so aliased, batched or pruned queries all
+resolve the way GitHub would resolve them.
+
+Logins starting with ``ghost-`` do not exist (REST 404, GraphQL NOT_FOUND).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import re
+import socket
+import threading
+import time
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+MISSING_LOGIN_PREFIX = "ghost-"
+LANGUAGES = (
+    "Python", "TypeScript", "JavaScript", "Go", "Rust", "Java",
+    "C++", "Shell", "HTML", "CSS", "Ruby", "Kotlin",
+)
+CALENDAR_COLORS = ("#ebedf0", "#9be9a8", "#40c463", "#30a14e", "#216e39")
+RATE_LIMIT = 5000
+
+
+def _hash(*parts: Any) -> int:
+    digest = hashlib.blake2b(":".join(str(part) for part in parts).encode(), digest_size=8)
+    return int.from_bytes(digest.digest(), "big")
+
+
+def _parse_day(value: str) -> date:
+    return date.fromisoformat(value[:10])
+
+
+def _days(start: date, end: date) -> Iterator[date]:
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+@lru_cache(maxsize=200_000)
+def _activity(login: str, day: date) -> tuple[int, int, int, int]:
+    """Return (commits, issues, pull requests, reviews) for one login and day."""
+    roll = _hash(login, day)
+    commits = 0 if roll % 100 < 40 else 1 + (roll >> 8) % 7
+    issues = 1 if (roll >> 16) % 100 < 5 else 0
+    pull_requests = 1 if (roll >> 24) % 100 < 8 else 0
+    reviews = 1 + (roll >> 32) % 2 if (roll >> 40) % 100 < 6 else 0
+    return commits, issues, pull_requests, reviews
+
+
+@lru_cache(maxsize=50_000)
+def _repo_names(login: str) -> tuple[str, ...]:
+    return tuple(f"{login}/project-{index}" for index in range(3 + _hash(login) % 10))
+
+
+def _commit_repo(login: str, day: date, index: int) -> int:
+    return _hash(login, day, index, "repo") % len(_repo_names(login))
+
+
+def _commit_size(login: str, day: date, index: int) -> tuple[int, int, int]:
+    roll = _hash(login, day, index, "size")
+    uniform = ((roll & 0xFFFF) + 1) / 65537
+    total = min(int(4 / (uniform ** 0.9)), 20_000)
+    additions = total * (60 + (roll >> 16) % 40) // 100
+    return additions, total - additions, 1 + (roll >> 24) % 12
+
+
+def _color(count: int) -> str:
+    return CALENDAR_COLORS[min(count // 3 + (1 if count else 0), 4)]
+
+
+# --- GraphQL selection-set interpreter ---------------------------------------
+
+_TOKEN = re.compile(
+    r'\s+|,|#[^\n]*|(\.\.\.|[{}():!$=\[\]@]|"(?:\\.|[^"\\])*"|-?\d+(?:\.\d+)?|[_A-Za-z][_0-9A-Za-z]*)'
+)
+
+
+class _Field:
+    __slots__ = ("alias", "name", "args", "selections")
+
+    def __init__(self, alias: str, name: str, args: Dict[str, Any], selections: list):
+        self.alias = alias
+        self.name = name
+        self.args = args
+        self.selections = selections
+
+
+class _Spread:
+    __slots__ = ("fragment", "selections")
+
+    def __init__(self, fragment: Optional[str], selections: list):
+        self.fragment = fragment
+        self.selections = selections
+
+
+class _Variable:
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.tokens = [match.group(1) for match in _TOKEN.finditer(text) if match.group(1)]
+        self.position = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self, expected: Optional[str] = None) -> str:
+        token = self.peek()
+        if token is None or (expected is not None and token != expected):
+            raise ValueError(f"Expected {expected!r}, found {token!r}")
+        self.position += 1
+        return token
+
+    def document(self) -> tuple[list, Dict[str, list]]:
+        operation: list = []
+        fragments: Dict[str, list] = {}
+        while self.peek() is not None:
+            if self.peek() == "fragment":
+                self.take()
+                name = self.take()
+                self.take("on")
+                self.take()
+                fragments[name] = self.selection_set()
+                continue
+            if self.peek() == "query":
+                self.take()
+                if self.peek() not in ("(", "{"):
+                    self.take()
+                if self.peek() == "(":
+                    self.skip_group("(", ")")
+            operation = self.selection_set()
+        return operation, fragments
+
+    def skip_group(self, opener: str, closer: str) -> None:
+        depth = 0
+        while True:
+            token = self.take()
+            if token == opener:
+                depth += 1
+            elif token == closer:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def selection_set(self) -> list:
+        self.take("{")
+        selections: list = []
+        while self.peek() != "}":
+            if self.peek() == "...":
+                self.take()
+                if self.peek() == "on":
+                    self.take()
+                    self.take()
+                    selections.append(_Spread(None, self.selection_set()))
+                else:
+                    selections.append(_Spread(self.take(), []))
+                continue
+            alias = name = self.take()
+            if self.peek() == ":":
+                self.take()
+                name = self.take()
+            args = self.arguments() if self.peek() == "(" else {}
+            children = self.selection_set() if self.peek() == "{" else []
+            selections.append(_Field(alias, name, args, children))
+        self.take("}")
+        return selections
+
+    def arguments(self) -> Dict[str, Any]:
+        self.take("(")
+        args: Dict[str, Any] = {}
+        while self.peek() != ")":
+            key = self.take()
+            self.take(":")
+            args[key] = self.value()
+        self.take(")")
+        return args
+
+    def value(self) -> Any:
+        token = self.take()
+        if token == "$":
+            return _Variable(self.take())
+        if token == "{":
+            obj: Dict[str, Any] = {}
+            while self.peek() != "}":
+                key = self.take()
+                self.take(":")
+                obj[key] = self.value()
+            self.take("}")
+            return obj
+        if token == "[":
+            items = []
+            while self.peek() != "]":
+                items.append(self.value())
+            self.take("]")
+            return items
+        if token.startswith('"'):
+            return token[1:-1]
+        if token in ("true", "false"):
+            return token == "true"
+        if token == "null":
+            return None
+        if token[0].isdigit() or token[0] == "-":
+            return float(token) if "." in token else int(token)
+        return token
+
+
+@lru_cache(maxsize=1024)
+def _parse(query: str) -> tuple[list, Dict[str, list]]:
+    return _Parser(query).document()
+
+
+def _bind(value: Any, variables: Dict[str, Any]) -> Any:
+    if isinstance(value, _Variable):
+        return variables.get(value.name)
+    if isinstance(value, dict):
+        return {key: _bind(item, variables) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_bind(item, variables) for item in value]
+    return value
+
+
+class _Context:
+    def __init__(self, variables: Dict[str, Any], fragments: Dict[str, list]):
+        self.variables = variables
+        self.fragments = fragments
+        self.requested_nodes = 0
+        self.errors: list[Dict[str, Any]] = []
+
+
+def _execute(obj: Any, selections: list, ctx: _Context, path: tuple) -> Dict[str, Any]:
+    result: Dict[str, Any] = {}
+    for selection in selections:
+        if isinstance(selection, _Spread):
+            children = selection.selections or ctx.fragments.get(selection.fragment, [])
+            result.update(_execute(obj, children, ctx, path))
+            continue
+        args = {key: _bind(value, ctx.variables) for key, value in selection.args.items()}
+        for key in ("first", "maxRepositories"):
+            if isinstance(args.get(key), int):
+                ctx.requested_nodes += args[key]
+        value = obj.resolve(selection.name, args, ctx, path + (selection.alias,))
+        result[selection.alias] = _complete(value, selection.selections, ctx, path + (selection.alias,))
+    return result
+
+
+def _complete(value: Any, selections: list, ctx: _Context, path: tuple) -> Any:
+    if value is None or not selections:
+        return value
+    if isinstance(value, list):
+        return [_complete(item, selections, ctx, path) for item in value]
+    if isinstance(value, dict):
+        return _execute(_Record(value), selections, ctx, path)
+    return _execute(value, selections, ctx, path)
+
+
+class _Record:
+    def __init__(self, values: Dict[str, Any]):
+        self.values = values
+
+    def resolve(self, name: str, args: Dict[str, Any], ctx: _Context, path: tuple) -> Any:
+        value = self.values.get(name)
+        return value(args) if callable(value) else value
+
+
+class _Query:
+    def resolve(self, name: str, args: Dict[str, Any], ctx: _Context, path: tuple) -> Any:
+        if name == "user":
+            login = args.get("login") or ""
+            if login.startswith(MISSING_LOGIN_PREFIX):
+                ctx.errors.append({
+                    "type": "NOT_FOUND",
+                    "path": list(path),
+                    "message": f"Could not resolve to a User with the login of '{login}'.",
+                })
+                return None
+            return _User(login)
+        if name == "repository":
+            owner = args.get("owner") or ""
+            if owner.startswith(MISSING_LOGIN_PREFIX):
+                return None
+            return _Repository(owner, f"{owner}/{args.get('name')}")
+        if name == "rateLimit":
+            return {
+                "cost": max(1, ctx.requested_nodes // 100),
+                "limit": RATE_LIMIT,
+                "remaining": RATE_LIMIT - 1,
+                "used": 1,
+                "resetAt": None,
+            }
+        return None
+
+
+class _User:
+    def __init__(self, login: str):
+        self.login = login
+
+    def resolve(self, name: str, args: Dict[str, Any], ctx: _Context, path: tuple) -> Any:
+        if name == "id":
+            return f"U_{self.login}"
+        if name == "login":
+            return self.login
+        if name == "contributionsCollection":
+            start = _parse_day(args.get("from") or "2025-01-01")
+            end = _parse_day(args.get("to") or "2025-12-31")
+            return _Contributions(self.login, start, end)
+        return None
+
+
+class _Contributions:
+    def __init__(self, login: str, start: date, end: date):
+        self.login = login
+        self.start = start
+        self.end = end
+
+    def _total(self, index: int) -> int:
+        return sum(_activity(self.login, day)[index] for day in _days(self.start, self.end))
+
+    def resolve(self, name: str, args: Dict[str, Any], ctx: _Context, path: tuple) -> Any:
+        if name == "totalCommitContributions":
+            return self._total(0)
+        if name == "totalIssueContributions":
+            return self._total(1)
+        if name == "totalPullRequestContributions":
+            return self._total(2)
+        if name == "totalPullRequestReviewContributions":
+            return self._total(3)
+        if name == "contributionCalendar":
+            return self._calendar()
+        if name == "commitContributionsByRepository":
+            return self._by_repository(int(args.get("maxRepositories") or 25))
+        return None
+
+    def _calendar(self) -> Dict[str, Any]:
+        weeks: list[Dict[str, Any]] = []
+        total = 0
+        for day in _days(self.start, self.end):
+            count = sum(_activity(self.login, day))
+            total += count
+            if not weeks or day.weekday() == 6:
+                weeks.append({"contributionDays": []})
+            weeks[-1]["contributionDays"].append({
+                "date": day.isoformat(),
+                "contributionCount": count,
+                "color": _color(count),
+            })
+        return {"totalContributions": total, "weeks": weeks}
+
+    def _by_repository(self, limit: int) -> list[Dict[str, Any]]:
+        names = _repo_names(self.login)
+        counts = [0] * len(names)
+        for day in _days(self.start, self.end):
+            for index in range(_activity(self.login, day)[0]):
+                counts[_commit_repo(self.login, day, index)] += 1
+        entries = [
+            {
+                "repository": _Repository(self.login, names[index]),
+                "contributions": {"totalCount": counts[index]},
+            }
+            for index in sorted(range(len(names)), key=lambda i: -counts[i])
+            if counts[index]
+        ]
+        return entries[:limit]
+
+
+class _Repository:
+    def __init__(self, owner: str, name_with_owner: str):
+        self.owner = owner
+        self.name_with_owner = name_with_owner
+        names = _repo_names(owner)
+        self.index = names.index(name_with_owner) if name_with_owner in names else -1
+
+    def resolve(self, name: str, args: Dict[str, Any], ctx: _Context, path: tuple) -> Any:
+        if name == "nameWithOwner":
+            return self.name_with_owner
+        if name == "defaultBranchRef":
+            return {"name": "main", "target": self}
+        if name == "history":
+            return self._history(args)
+        if name == "languages":
+            return self._languages(int(args.get("first") or 10))
+        return None
+
+    def _languages(self, first: int) -> Dict[str, Any]:
+        roll = _hash(self.name_with_owner, "languages")
+        count = min(first, 1 + roll % 5)
+        edges = [
+            {
+                "size": 100_000 // (position + 1) + (roll >> (position * 4)) % 5_000,
+                "node": {"name": LANGUAGES[(roll + position * 7) % len(LANGUAGES)]},
+            }
+            for position in range(count)
+        ]
+        return {"edges": edges}
+
+    def _history(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        end = _parse_day(args.get("until") or "2025-12-31")
+        start = _parse_day(args.get("since") or "2025-01-01")
+        commits = []
+        day = end
+        while day >= start and self.index >= 0:
+            for index in range(_activity(self.owner, day)[0]):
+                if _commit_repo(self.owner, day, index) == self.index:
+                    commits.append((day, index))
+            day -= timedelta(days=1)
+        offset = int(args.get("after") or 0)
+        first = int(args.get("first") or 100)
+        page = commits[offset: offset + first]
+        nodes = []
+        for day, index in page:
+            additions, deletions, changed = _commit_size(self.owner, day, index)
+            nodes.append({
+                "additions": additions,
+                "deletions": deletions,
+                "changedFiles": changed,
+                "committedDate": f"{day.isoformat()}T{12 + index % 10:02d}:{index * 7 % 60:02d}:00Z",
+            })
+        has_next = offset + first < len(commits)
+        return {
+            "totalCount": len(commits),
+            "nodes": nodes,
+            "pageInfo": {"hasNextPage": has_next, "endCursor": str(offset + len(page))},
+        }
+
+
+# --- HTTP server -------------------------------------------------------------
+
+
+class FakeGitHub:
+    """Run the stand-in GitHub API on a local port in a background thread."""
+
+    def __init__(self, latency_ms: float = 0.0, port: int = 0):
+        self.latency = latency_ms / 1000
+        # Set to simulate a GitHub outage: every call answers 502.
+        self.outage = False
+        self.port = port or _free_port()
+        self.stats: Dict[str, int] = {}
+        self.reset_stats()
+        self._lock = threading.Lock()
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self.app = Starlette(routes=[
+            Route("/graphql", self._graphql, methods=["POST"]),
+            Route("/rate_limit", self._rate_limit),
+            Route("/users/{login}", self._user),
+            Route("/users/{login}/repos", self._repos),
+        ])
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def reset_stats(self) -> None:
+        self.stats = {"rest": 0, "graphql": 0, "graphql_cost": 0, "bytes": 0}
+
+    def start(self) -> "FakeGitHub":
+        config = uvicorn.Config(
+            self.app, host="127.0.0.1", port=self.port, log_level="warning", access_log=False
+        )
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Fake GitHub server did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.should_exit = True
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "FakeGitHub":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _count(self, key: str, cost: int = 0, size: int = 0) -> Dict[str, str]:
+        with self._lock:
+            self.stats[key] += 1
+            self.stats["graphql_cost"] += cost
+            self.stats["bytes"] += size
+            used = self.stats["rest"] + self.stats["graphql_cost"]
+        return {
+            "X-RateLimit-Limit": str(RATE_LIMIT),
+            "X-RateLimit-Remaining": str(max(RATE_LIMIT - used, 0)),
+            "X-RateLimit-Used": str(used),
+            "X-RateLimit-Resource": "graphql" if key == "graphql" else "core",
+            "X-RateLimit-Reset": str((int(time.time()) // 3600 + 1) * 3600),
+        }
+
+    async def _delay(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def _graphql(self, request: Request) -> JSONResponse:
+        await self._delay()
+        if self.outage:
+            return JSONResponse({"message": "Server Error"}, status_code=502)
+        body = await request.json()
+        try:
+            operation, fragments = _parse(body.get("query") or "")
+        except ValueError as exc:
+            return JSONResponse({"errors": [{"message": str(exc)}]}, headers=self._count("graphql"))
+        ctx = _Context(body.get("variables") or {}, fragments)
+        data = _execute(_Query(), operation, ctx, ())
+        payload: Dict[str, Any] = {"data": data}
+        if ctx.errors:
+            payload["errors"] = ctx.errors
+        response = JSONResponse(payload)
+        cost = max(1, ctx.requested_nodes // 100)
+        response.headers.update(self._count("graphql", cost, len(response.body)))
+        return response
+
+    async def _user(self, request: Request) -> JSONResponse:
+        await self._delay()
+        if self.outage:
+            return JSONResponse({"message": "Server Error"}, status_code=502)
+        login = request.path_params["login"]
+        if login.startswith(MISSING_LOGIN_PREFIX):
+            return JSONResponse({"message": "Not Found"}, status_code=404, headers=self._count("rest"))
+        repo_count = len(_repo_names(login))
+        payload = {
+            "login": login,
+            "name": login.replace("-", " ").title(),
+            "company": None,
+            "blog": "",
+            "location": None,
+            "avatar_url": f"https://avatars.example.invalid/{login}",
+            "html_url": f"https://github.com/{login}",
+            "public_repos": repo_count,
+            "public_gists": _hash(login, "gists") % 20,
+            "followers": _hash(login, "followers") % 5000,
+            "following": _hash(login, "following") % 300,
+            "created_at": "2015-06-01T00:00:00Z",
+            "updated_at": "2025-06-01T00:00:00Z",
+        }
+        response = JSONResponse(payload)
+        response.headers.update(self._count("rest", size=len(response.body)))
+        return response
+
+    async def _repos(self, request: Request) -> JSONResponse:
+        await self._delay()
+        if self.outage:
+            return JSONResponse({"message": "Server Error"}, status_code=502)
+        login = request.path_params["login"]
+        if login.startswith(MISSING_LOGIN_PREFIX):
+            return JSONResponse({"message": "Not Found"}, status_code=404, headers=self._count("rest"))
+        per_page = int(request.query_params.get("per_page", 30))
+        page = int(request.query_params.get("page", 1))
+        repos = [
+            {
+                "full_name": name,
+                "language": LANGUAGES[_hash(name, "primary") % len(LANGUAGES)],
+                "stargazers_count": _hash(name, "stars") % 2000,
+            }
+            for name in _repo_names(login)
+        ]
+        repos.sort(key=lambda repo: -repo["stargazers_count"])
+        response = JSONResponse(repos[(page - 1) * per_page: page * per_page])
+        response.headers.update(self._count("rest", size=len(response.body)))
+        return response
+
+    async def _rate_limit(self, request: Request) -> JSONResponse:
+        resource = {"limit": RATE_LIMIT, "used": 0, "remaining": RATE_LIMIT, "reset": int(time.time()) + 3600}
+        return JSONResponse({"resources": {"core": resource, "search": resource, "graphql": resource}})
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
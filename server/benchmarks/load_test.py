@@ -0,0 +1,289 @@
+"""Closed-loop load test for the recap endpoints.
+
+Replays the request mix the client issues for one recap
+(``fetchAllRecapData`` in ``client/src/lib/api.ts``: eight GET requests
+sent concurrently) against the API, backed by the local stand-in GitHub
+from ``benchmarks.fake_github``. Concurrency is ramped through the given
+levels; each level reports throughput, per-endpoint latency percentiles and
+histograms, error rates and upstream calls per recap as JSON.
+
+Usage (from ``server/``)::
+
+    python -m benchmarks.load_test --concurrency 1,4,16 --duration 10
+    python -m benchmarks.load_test --target uvicorn --output run.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bisect
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import httpx
+
+from benchmarks.fake_github import MISSING_LOGIN_PREFIX, FakeGitHub, _free_port
+
+RECAP_ENDPOINTS = (
+    "/github/search/user-summary",
+    "/github/search/year-summary",
+    "/github/search/commit-count-monthly-2025",
+    "/github/search/repo-focus",
+    "/github/search/contribution-heatmap",
+    "/github/search/languages",
+    "/github/search/top-languages-by-stars",
+    "/github/search/commit-size-distribution",
+)
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+
+class LatencyRecorder:
+    """Collect latencies for one endpoint and summarize them."""
+
+    def __init__(self) -> None:
+        self.samples: list[float] = []
+        self.errors = 0
+        self.statuses: Dict[int, int] = {}
+
+    def add(self, elapsed_ms: float, status: int) -> None:
+        self.samples.append(elapsed_ms)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status >= 400:
+            self.errors += 1
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        count = len(ordered)
+        buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        for value in ordered:
+            buckets[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, value)] += 1
+        return {
+            "count": count,
+            "errors": self.errors,
+            "error_rate": round(self.errors / count, 4) if count else 0,
+            "statuses": {str(status): total for status, total in sorted(self.statuses.items())},
+            "mean_ms": round(sum(ordered) / count, 3) if count else 0,
+            "p50_ms": _quantile(ordered, 0.50),
+            "p90_ms": _quantile(ordered, 0.90),
+            "p99_ms": _quantile(ordered, 0.99),
+            "max_ms": round(ordered[-1], 3) if ordered else 0,
+            "histogram": {
+                "bounds_ms": list(HISTOGRAM_BOUNDS_MS),
+                "counts": buckets,
+            },
+        }
+
+
+def _quantile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0
+    index = min(int(q * len(ordered)), len(ordered) - 1)
+    return round(ordered[index], 3)
+
+
+class UsernamePicker:
+    """Draw usernames from a Zipf-skewed population, like real recap traffic."""
+
+    def __init__(self, users: int, skew: float, missing_ratio: float, seed: int):
+        self.random = random.Random(seed)
+        self.names = [f"loadtest-user-{index}" for index in range(users)]
+        weights = [1 / ((rank + 1) ** skew) for rank in range(users)]
+        total = sum(weights)
+        self.cumulative = []
+        running = 0.0
+        for weight in weights:
+            running += weight / total
+            self.cumulative.append(running)
+        self.missing_ratio = missing_ratio
+
+    def pick(self) -> str:
+        if self.missing_ratio and self.random.random() < self.missing_ratio:
+            return f"{MISSING_LOGIN_PREFIX}{self.random.randrange(10**9)}"
+        index = bisect.bisect_left(self.cumulative, self.random.random())
+        return self.names[min(index, len(self.names) - 1)]
+
+
+async def _run_level(
+    client: httpx.AsyncClient,
+    fake: FakeGitHub,
+    picker: UsernamePicker,
+    concurrency: int,
+    duration: float,
+) -> Dict[str, Any]:
+    endpoints = {path: LatencyRecorder() for path in RECAP_ENDPOINTS}
+    recaps = LatencyRecorder()
+    stop_at = time.perf_counter() + duration
+
+    async def timed_get(path: str, username: str) -> int:
+        started = time.perf_counter()
+        try:
+            response = await client.get(path, params={"username": username})
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 599
+        endpoints[path].add((time.perf_counter() - started) * 1000, status)
+        return status
+
+    async def virtual_user() -> None:
+        while time.perf_counter() < stop_at:
+            username = picker.pick()
+            started = time.perf_counter()
+            statuses = await asyncio.gather(*(timed_get(path, username) for path in RECAP_ENDPOINTS))
+            recaps.add((time.perf_counter() - started) * 1000, max(statuses))
+
+    fake.reset_stats()
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    upstream = dict(fake.stats)
+
+    recap_summary = recaps.summary()
+    completed = recap_summary["count"]
+    requests_sent = sum(recorder.summary()["count"] for recorder in endpoints.values())
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "recaps": completed,
+        "recaps_per_s": round(completed / elapsed, 3) if elapsed else 0,
+        "requests": requests_sent,
+        "requests_per_s": round(requests_sent / elapsed, 3) if elapsed else 0,
+        "recap_latency": recap_summary,
+        "endpoints": {path: recorder.summary() for path, recorder in endpoints.items()},
+        "upstream": {
+            **upstream,
+            "calls_per_recap": round((upstream["rest"] + upstream["graphql"]) / completed, 3) if completed else 0,
+            "rest_per_recap": round(upstream["rest"] / completed, 3) if completed else 0,
+            "graphql_per_recap": round(upstream["graphql"] / completed, 3) if completed else 0,
+            "graphql_cost_per_recap": round(upstream["graphql_cost"] / completed, 3) if completed else 0,
+        },
+    }
+
+
+def _server_env(github_url: str) -> Dict[str, str]:
+    """Point the API at the stand-in GitHub and pin the default recap window."""
+    return {
+        "GITHUB_BASE_URL": github_url,
+        "START_DATE": os.environ.get("START_DATE", "2025-01-01"),
+        "END_DATE": os.environ.get("END_DATE", "2025-12-31"),
+    }
+
+
+def _start_uvicorn(github_url: str) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = {**os.environ, **_server_env(github_url)}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("uvicorn did not become healthy")
+
+
+def _build_client(target: str, github_url: str) -> tuple[httpx.AsyncClient, Optional[subprocess.Popen]]:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    timeout = httpx.Timeout(60.0)
+    if target == "inprocess":
+        os.environ.update(_server_env(github_url))
+        from main import app
+
+        # The app's logging setup re-enables uvicorn's access log, which in
+        # this process would only log the stand-in GitHub's traffic, and
+        # raises httpx to INFO, which would log every load-test request.
+        logging.getLogger("uvicorn.access").disabled = True
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        return httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout), None
+    if target == "uvicorn":
+        process, base_url = _start_uvicorn(github_url)
+        return httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits), process
+    raise ValueError(f"Unknown target: {target}")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    levels = [int(value) for value in args.concurrency.split(",") if value]
+    picker = UsernamePicker(args.users, args.skew, args.missing_ratio, args.seed)
+    with FakeGitHub(latency_ms=args.upstream_latency_ms) as fake:
+        client, process = _build_client(args.target, fake.base_url)
+        try:
+            async with client:
+                results = []
+                for concurrency in levels:
+                    level = await _run_level(client, fake, picker, concurrency, args.duration)
+                    results.append(level)
+                    _print_level(level)
+        finally:
+            if process:
+                process.terminate()
+                process.wait(timeout=10)
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "target": args.target,
+            "duration_s": args.duration,
+            "users": args.users,
+            "skew": args.skew,
+            "missing_ratio": args.missing_ratio,
+            "upstream_latency_ms": args.upstream_latency_ms,
+            "seed": args.seed,
+            "endpoints": list(RECAP_ENDPOINTS),
+        },
+        "levels": results,
+    }
+
+
+def _print_level(level: Dict[str, Any]) -> None:
+    recap = level["recap_latency"]
+    print(
+        f"c={level['concurrency']:<4} recaps/s={level['recaps_per_s']:<9} "
+        f"p50={recap['p50_ms']:<9} p99={recap['p99_ms']:<9} "
+        f"errors={recap['error_rate']:<7} upstream/recap={level['upstream']['calls_per_recap']}",
+        file=sys.stderr,
+    )
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--users", type=int, default=500, help="Size of the username population")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of username popularity")
+    parser.add_argument("--missing-ratio", type=float, default=0.0, help="Share of recaps for unknown logins")
+    parser.add_argument("--upstream-latency-ms", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=2025)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(payload)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,60 @@ class Environment():
     GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
     GITHUB_BASE_URL = os.getenv("GITHUB_BASE_URL")
 
+    # Admin endpoints (disabled when unset)
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
     # Date Defaults
     START_DATE = os.getenv("START_DATE")
     END_DATE = os.getenv("END_DATE")
+
+    # Upstream calls
+    REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "25"))
+
+    # Telemetry
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "rich")
+    ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1.0"))
+    METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", "1.0"))
+
+    # Response cache
+    CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "900"))
+    CACHE_MAX_STALE_SECONDS = float(os.getenv("CACHE_MAX_STALE_SECONDS", "3600"))
+    CACHE_STALE_IF_ERROR_SECONDS = float(os.getenv("CACHE_STALE_IF_ERROR_SECONDS", "86400"))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "5000"))
+    NEGATIVE_CACHE_TTL_SECONDS = float(os.getenv("NEGATIVE_CACHE_TTL_SECONDS", "300"))
+    NEGATIVE_CACHE_MAX_ENTRIES = int(os.getenv("NEGATIVE_CACHE_MAX_ENTRIES", "100000"))
+    SNAPSHOT_MAX_ENTRIES = int(os.getenv("SNAPSHOT_MAX_ENTRIES", "10000"))
+    SNAPSHOT_OVERLAP_DAYS = int(os.getenv("SNAPSHOT_OVERLAP_DAYS", "2"))
+    SNAPSHOT_TTL_SECONDS = float(os.getenv("SNAPSHOT_TTL_SECONDS", "86400"))
+
+    # Hot-username tracking and cache pre-warming
+    HOT_KEYS_CAPACITY = int(os.getenv("HOT_KEYS_CAPACITY", "512"))
+    HOT_KEYS_TOP_K = int(os.getenv("HOT_KEYS_TOP_K", "20"))
+    HOT_KEYS_WARM_INTERVAL_SECONDS = float(os.getenv("HOT_KEYS_WARM_INTERVAL_SECONDS", "30"))
+    HOT_KEYS_WARM_BUDGET_SHARE = float(os.getenv("HOT_KEYS_WARM_BUDGET_SHARE", "0.1"))
+
+    # Upstream circuit breakers and adaptive concurrency limits
+    CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+    CIRCUIT_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.8"))
+    CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "10"))
+    CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+    UPSTREAM_CONCURRENCY_INITIAL = float(os.getenv("UPSTREAM_CONCURRENCY_INITIAL", "16"))
+    UPSTREAM_CONCURRENCY_MAX = float(os.getenv("UPSTREAM_CONCURRENCY_MAX", "64"))
+    UPSTREAM_LATENCY_TARGET_SECONDS = float(os.getenv("UPSTREAM_LATENCY_TARGET_SECONDS", "3"))
+    UPSTREAM_QUEUE_SECONDS = float(os.getenv("UPSTREAM_QUEUE_SECONDS", "2"))
+
+    # Background jobs (mode=job); off by default, since they need a long-running server
+    JOB_MODE_ENABLED = os.getenv("JOB_MODE_ENABLED", "false").lower() in ("1", "true", "yes")
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", "900"))
+    JOB_MAX_ENTRIES = int(os.getenv("JOB_MAX_ENTRIES", "1000"))
+    JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "32"))
+    JOB_DEADLINE_SECONDS = float(os.getenv("JOB_DEADLINE_SECONDS", "600"))
+
+    # Cohort ranks
+    COHORT_MAX_WINDOWS = int(os.getenv("COHORT_MAX_WINDOWS", "8"))
+
+    # Response compression
+    COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
@@ -4,17 +4,52 @@ from utils.pathing import standardize_sys_path
 
 standardize_sys_path()
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from api.routers.admin_router import router as admin_router
 from api.routers.github_search_router import (
     router as github_search_router,
 )
 from api.routers.health_router import router as health_router
+from api.routers.metrics_router import router as metrics_router
 from config.cors import setup_cors
+from services.compression import setup_compression
+from services.deadline import setup_deadlines
+from services.hot_keys import cache_warmer
+from services.jobs import job_manager
+from telemetry.instrumentation import setup_instrumentation
+from telemetry.logging import setup_logging
+
+setup_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep the most requested users' recaps warm (not under Lambda, where lifespan is off)
+    cache_warmer.start()
+    try:
+        yield
+    finally:
+        cache_warmer.stop()
+        job_manager.shutdown()
 
-app = FastAPI(title="CommitRecap")
+
+app = FastAPI(title="CommitRecap", lifespan=lifespan)
 
 # Setup CORS middleware
 setup_cors(app)
 
+# Bound how long a request may spend waiting on GitHub
+setup_deadlines(app)
+
+# Compress large responses; inside instrumentation so it can see the cache entry
+setup_compression(app)
+
+# Time requests and upstream calls (Server-Timing header, /metrics)
+setup_instrumentation(app)
+
 app.include_router(github_search_router)
 app.include_router(health_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
@@ -0,0 +1,410 @@
+"""In-process response cache for controller functions.
+
+Entries go through three windows after they are stored:
+
+- fresh: served as-is. Close to expiry a hit may trigger an early background
+  refresh (probabilistic early expiration), so hot keys rarely expire at all.
+- stale (up to ``max_stale`` past expiry): served immediately while exactly
+  one background refresh per key recomputes the value.
+- too stale: callers block on a fresh load, coalesced so only one upstream
+  computation runs per key. If that load fails with a 5xx and the entry is
+  still inside the ``stale_if_error`` window, the old value is served.
+
+TTLs are jittered so entries written together do not expire together.
+Results marked ``truncated`` (cut short by the request deadline) are never
+stored; the full result is computed in the background instead.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import logging
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple, TypeVar
+
+import requests
+from fastapi import HTTPException
+
+from config.env import Environment
+from telemetry.instrumentation import current_trace, in_operation
+from telemetry.metrics import registry
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+logger = logging.getLogger(__name__)
+
+REFRESH_RETRY_SECONDS = 5.0
+
+# Whether the running cached call is the one the request is served from,
+# rather than one made from inside another controller function. Only that
+# call records its cache status and entry on the request trace.
+_serves_request: ContextVar[bool] = ContextVar("cache_serves_request", default=False)
+
+
+class CacheEntry:
+    __slots__ = (
+        "key",
+        "value",
+        "tag",
+        "loader",
+        "fresh_until",
+        "stale_until",
+        "error_until",
+        "compute_seconds",
+        "refreshing",
+        "retry_at",
+        "variants",
+        "hits",
+        "warmed",
+    )
+
+    def __init__(self, key: Hashable, tag: Optional[str], loader: Callable[[], Any]):
+        self.key = key
+        self.tag = tag
+        self.loader = loader
+        self.value: Any = None
+        self.fresh_until = 0.0
+        self.stale_until = 0.0
+        self.error_until = 0.0
+        self.compute_seconds = 0.0
+        self.refreshing = False
+        self.retry_at = 0.0
+        # Encoded response bodies for this value, filled in by the compression
+        # middleware: (encoding, body digest) -> compressed bytes.
+        self.variants: Dict[Tuple[str, bytes], bytes] = {}
+        self.hits = 0
+        # Stored by a pre-warming refresh rather than on demand.
+        self.warmed = False
+
+
+class _Flight:
+    """A load in progress that concurrent callers for the same key wait on."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+def _is_upstream_failure(exc: BaseException) -> bool:
+    if isinstance(exc, HTTPException):
+        return exc.status_code >= 500
+    return isinstance(exc, requests.RequestException)
+
+
+def _is_truncated(value: Any) -> bool:
+    return isinstance(value, dict) and bool(value.get("truncated"))
+
+
+class ResponseCache:
+    """LRU cache with stale-while-revalidate and stampede protection."""
+
+    def __init__(
+        self,
+        ttl: float,
+        max_stale: float,
+        stale_if_error: float,
+        max_entries: int,
+        jitter: float = 0.1,
+        early_expiration_beta: float = 1.0,
+        refresh_workers: int = 4,
+    ):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.stale_if_error = stale_if_error
+        self.max_entries = max_entries
+        self.jitter = jitter
+        self.beta = early_expiration_beta
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._backfills: set = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=refresh_workers, thread_name_prefix="cache-refresh"
+        )
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "early_refreshes": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "stale_if_error": 0,
+            "evictions": 0,
+            "warmed_hits": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def entries(self) -> list[CacheEntry]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        tag: Optional[str] = None,
+    ) -> Any:
+        """Return the cached value for ``key``, loading it with ``loader`` if needed."""
+        if not self.enabled:
+            return loader()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is not None:
+            if now < entry.fresh_until:
+                if self._expires_early(entry, now):
+                    self._count("early_refreshes")
+                    self.schedule_refresh(entry)
+                self._count_hit(entry)
+                self._mark("hit", entry)
+                return entry.value
+            if now < entry.stale_until:
+                self.schedule_refresh(entry)
+                self._count_hit(entry, "stale_hits")
+                self._mark("stale", entry)
+                return entry.value
+
+        self._mark("miss")
+        return self._load(key, loader, tag, entry)
+
+    def schedule_refresh(self, entry: CacheEntry) -> bool:
+        """Refresh ``entry`` in the background unless a refresh is already running."""
+        now = time.monotonic()
+        with self._lock:
+            if entry.refreshing or now < entry.retry_at:
+                return False
+            entry.refreshing = True
+        self._executor.submit(self._refresh, entry)
+        return True
+
+    def refresh(self, entry: CacheEntry, warmed: bool = False) -> bool:
+        """Recompute ``entry`` in the calling thread; False if skipped or failed."""
+        now = time.monotonic()
+        with self._lock:
+            if entry.refreshing or now < entry.retry_at:
+                return False
+            entry.refreshing = True
+        if not self._refresh(entry):
+            return False
+        if warmed:
+            with self._lock:
+                stored = self._entries.get(entry.key)
+                if stored is not None and stored is not entry:
+                    stored.warmed = True
+        return True
+
+    def invalidate(self, predicate: Callable[[CacheEntry], bool]) -> int:
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if predicate(entry)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _expires_early(self, entry: CacheEntry, now: float) -> bool:
+        # XFetch: refresh with rising probability as expiry approaches, scaled
+        # by how long the value took to compute.
+        if entry.refreshing or not entry.compute_seconds:
+            return False
+        gap = -entry.compute_seconds * self.beta * math.log(1.0 - random.random())
+        return now + gap >= entry.fresh_until
+
+    def _load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        tag: Optional[str],
+        entry: Optional[CacheEntry],
+    ) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            self._count("coalesced")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        self._count("misses")
+        try:
+            flight.value = self._compute(key, loader, tag)
+            return flight.value
+        except Exception as exc:
+            if entry is not None and _is_upstream_failure(exc) and time.monotonic() < entry.error_until:
+                self._count("stale_if_error")
+                self._mark("stale-if-error", entry)
+                flight.value = entry.value
+                return entry.value
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _compute(self, key: Hashable, loader: Callable[[], Any], tag: Optional[str]) -> Any:
+        started = time.monotonic()
+        value = loader()
+        finished = time.monotonic()
+        if _is_truncated(value):
+            # Cut short by the request deadline: hand it to this caller only,
+            # and finish the full computation off the request path.
+            self._backfill(key, loader, tag)
+            return value
+        entry = self._store(key, loader, tag, value, finished - started, finished)
+        trace = current_trace()
+        if trace is not None and _serves_request.get():
+            trace.cache_entry = entry
+        return value
+
+    def _backfill(self, key: Hashable, loader: Callable[[], Any], tag: Optional[str]) -> None:
+        with self._lock:
+            if key in self._backfills:
+                return
+            self._backfills.add(key)
+
+        def run() -> None:
+            try:
+                self._compute(key, loader, tag)
+            except Exception:
+                logger.warning("Background completion failed for %s", key, exc_info=True)
+            finally:
+                with self._lock:
+                    self._backfills.discard(key)
+
+        self._executor.submit(run)
+
+    def _store(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        tag: Optional[str],
+        value: Any,
+        compute_seconds: float,
+        now: float,
+    ) -> CacheEntry:
+        ttl = self.ttl * (1 + random.uniform(-self.jitter, self.jitter))
+        entry = CacheEntry(key, tag, loader)
+        entry.value = value
+        entry.compute_seconds = compute_seconds
+        entry.fresh_until = now + ttl
+        entry.stale_until = entry.fresh_until + self.max_stale
+        entry.error_until = entry.fresh_until + max(self.stale_if_error, self.max_stale)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return entry
+
+    def _refresh(self, entry: CacheEntry) -> bool:
+        try:
+            self._compute(entry.key, entry.loader, entry.tag)
+            self._count("refreshes")
+            return True
+        except Exception:
+            self._count("refresh_failures")
+            entry.retry_at = time.monotonic() + REFRESH_RETRY_SECONDS
+            logger.warning("Background refresh failed for %s", entry.key, exc_info=True)
+            return False
+        finally:
+            entry.refreshing = False
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _count_hit(self, entry: CacheEntry, stat: str = "hits") -> None:
+        with self._lock:
+            self.stats[stat] += 1
+            entry.hits += 1
+            if entry.warmed and entry.hits == 1:
+                self.stats["warmed_hits"] += 1
+
+    @staticmethod
+    def _mark(status: str, entry: Optional[CacheEntry] = None) -> None:
+        trace = current_trace()
+        if trace is not None and _serves_request.get():
+            trace.cache_status = status
+            trace.cache_entry = entry
+
+    def collect_metrics(self) -> Iterable[tuple]:
+        with self._lock:
+            stats = dict(self.stats)
+            size = len(self._entries)
+        yield (
+            "commitrecap_cache_events_total",
+            "counter",
+            "Response cache lookups and refreshes, by event.",
+            [("commitrecap_cache_events_total", {"event": name}, value) for name, value in stats.items()],
+        )
+        yield (
+            "commitrecap_cache_entries",
+            "gauge",
+            "Entries held in the response cache.",
+            [("commitrecap_cache_entries", {}, size)],
+        )
+
+
+response_cache = ResponseCache(
+    ttl=Environment.CACHE_TTL_SECONDS,
+    max_stale=Environment.CACHE_MAX_STALE_SECONDS,
+    stale_if_error=Environment.CACHE_STALE_IF_ERROR_SECONDS,
+    max_entries=Environment.CACHE_MAX_ENTRIES,
+)
+registry.register_collector(response_cache.collect_metrics)
+
+
+def cached(func: F) -> F:
+    """
+    Serve a controller function's results through ``response_cache``.
+    Entries are keyed on the bound arguments with defaults applied, so
+    positional, keyword and omitted-default calls share one entry.
+    """
+    name = func.__name__
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = bound.arguments
+        key = (name, tuple(sorted(arguments.items())))
+        token = _serves_request.set(not in_operation())
+        try:
+            return response_cache.get_or_load(
+                key, functools.partial(func, **arguments), tag=arguments.get("username")
+            )
+        finally:
+            _serves_request.reset(token)
+
+    return wrapper  # type: ignore[return-value]
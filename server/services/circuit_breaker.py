@@ -0,0 +1,343 @@
+"""Circuit breakers and adaptive concurrency limits for GitHub calls.
+
+Each upstream resource (``rest``, ``graphql``) gets a ``CircuitBreaker``
+and an ``AdaptiveLimiter``; ``upstream_call`` wraps one GitHub call in
+both.
+
+- The breaker watches the outcomes of the last ``WINDOW_SECONDS``. Once at
+  least ``MIN_CALLS`` calls are in and the share of failures (transport
+  errors, 5xx, 429) or of slow calls reaches its threshold, it opens.
+  While open, calls fail at once with 503; cached endpoints then serve
+  their stale-if-error value. After ``open_seconds`` it lets
+  ``PROBE_CALLS`` trial calls through: if they all succeed it closes, and
+  if any fails it opens again.
+- The limiter caps calls in flight using AIMD. Each fast success raises the
+  limit by ``1/limit``, i.e. about one per round of calls. A failure or a
+  call slower than ``latency_target`` cuts the limit by ``DECREASE_FACTOR``,
+  at most once per ``latency_target``. A call waits up to ``queue_seconds``
+  for a slot, or until the request deadline, and then gets 503.
+
+A call cut short by the request's own deadline has no outcome of its own:
+it is never counted as a success, and counts as a slow call only once it
+ran past the slow-call (or latency) threshold.
+
+So when GitHub slows down, requests stop piling up threads waiting on
+the full upstream timeout.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import ContextManager, Dict, Iterable, Iterator, Optional
+
+import requests
+from fastapi import HTTPException
+
+from config.env import Environment
+from services.deadline import DeadlineExceeded, current_deadline
+from telemetry.metrics import registry
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+WINDOW_SECONDS = 30.0
+MIN_CALLS = 20
+PROBE_CALLS = 3
+MIN_LIMIT = 1.0
+DECREASE_FACTOR = 0.75
+
+UPSTREAM_EVENTS = registry.counter(
+    "commitrecap_upstream_guard_events_total",
+    "GitHub calls rejected by an open circuit or a full concurrency limit, and breaker transitions.",
+    ("resource", "event"),
+)
+
+
+class UpstreamUnavailable(HTTPException):
+    """Raised instead of calling GitHub while its circuit is open or its limit is full."""
+
+    def __init__(self, resource: str, reason: str, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail={"message": f"GitHub {resource} API is unavailable, retry later", "reason": reason},
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a sliding window of call outcomes."""
+
+    def __init__(
+        self,
+        resource: str,
+        failure_rate: float,
+        slow_call_rate: float,
+        slow_call_seconds: float,
+        open_seconds: float,
+    ):
+        self.resource = resource
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = 0.0
+        # (finished_at, failed, slow)
+        self._outcomes: deque = deque()
+        self._probes = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.open_seconds > 0
+
+    def retry_after(self) -> float:
+        return max(self.opened_at + self.open_seconds - time.monotonic(), 0.0)
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; a True in half-open state claims a probe."""
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() < self.opened_at + self.open_seconds:
+                    return False
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probes >= PROBE_CALLS:
+                    return False
+                self._probes += 1
+            return True
+
+    def release_probe(self) -> None:
+        """Hand back a half-open probe claimed by ``allow`` but never used."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record(self, failed: bool, seconds: float) -> None:
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        slow = seconds >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if failed or slow:
+                    self._transition(OPEN, now)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= PROBE_CALLS:
+                        self._transition(CLOSED)
+                return
+            if self.state == OPEN:
+                # A call that started before the circuit opened.
+                return
+            outcomes = self._outcomes
+            outcomes.append((now, failed, slow))
+            while outcomes and outcomes[0][0] < now - WINDOW_SECONDS:
+                outcomes.popleft()
+            if len(outcomes) < MIN_CALLS:
+                return
+            failures = sum(1 for _, failed_call, _ in outcomes if failed_call)
+            slow_calls = sum(1 for _, _, slow_call in outcomes if slow_call)
+            if (
+                failures >= self.failure_rate * len(outcomes)
+                or slow_calls >= self.slow_call_rate * len(outcomes)
+            ):
+                self._transition(OPEN, now)
+
+    def _transition(self, state: str, now: Optional[float] = None) -> None:
+        self.state = state
+        self._probes = 0
+        self._probe_successes = 0
+        if state == OPEN:
+            self.opened_at = now if now is not None else time.monotonic()
+        self._outcomes.clear()
+        UPSTREAM_EVENTS.inc(self.resource, state)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "calls_in_window": len(self._outcomes),
+                "retry_after_seconds": round(self.retry_after(), 3) if self.state == OPEN else 0,
+            }
+
+
+class AdaptiveLimiter:
+    """AIMD limit on concurrent calls to one resource."""
+
+    def __init__(self, initial: float, maximum: float, latency_target: float):
+        self.enabled = maximum > 0 and latency_target > 0
+        self.maximum = max(maximum, MIN_LIMIT)
+        self.limit = min(max(initial, MIN_LIMIT), self.maximum)
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: float) -> bool:
+        """Take a slot, waiting up to ``timeout`` seconds for one to free up."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.in_flight < int(self.limit), timeout):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, overloaded: bool, seconds: float) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if overloaded or seconds > self.latency_target:
+                if now - self._last_decrease >= self.latency_target:
+                    self.limit = max(MIN_LIMIT, self.limit * DECREASE_FACTOR)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify()
+
+    def abandon(self) -> None:
+        """Free a slot without adjusting the limit, for a call with no usable outcome."""
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._condition:
+            return {"limit": round(self.limit, 2), "in_flight": self.in_flight}
+
+
+class UpstreamCall:
+    """Outcome of one guarded call; set ``status`` once the response is in."""
+
+    __slots__ = ("status",)
+
+    def __init__(self) -> None:
+        self.status: Optional[int] = None
+
+
+class UpstreamGuard:
+    """Breaker and limiter for one upstream resource."""
+
+    def __init__(self, resource: str, breaker: CircuitBreaker, limiter: AdaptiveLimiter, queue_seconds: float):
+        self.resource = resource
+        self.breaker = breaker
+        self.limiter = limiter
+        self.queue_seconds = queue_seconds
+
+    def _queue_timeout(self) -> float:
+        deadline = current_deadline()
+        if deadline is None:
+            return self.queue_seconds
+        return max(min(self.queue_seconds, deadline.remaining()), 0.0)
+
+    @contextmanager
+    def call(self) -> Iterator[UpstreamCall]:
+        if not self.breaker.allow():
+            UPSTREAM_EVENTS.inc(self.resource, "rejected_open")
+            raise UpstreamUnavailable(self.resource, "circuit_open", self.breaker.retry_after())
+        limited = self.limiter.enabled
+        if limited and not self.limiter.acquire(self._queue_timeout()):
+            UPSTREAM_EVENTS.inc(self.resource, "rejected_limit")
+            self.breaker.release_probe()
+            raise UpstreamUnavailable(self.resource, "concurrency_limit", self.limiter.latency_target)
+
+        outcome = UpstreamCall()
+        started = time.perf_counter()
+        failed = False
+        cut_short = False
+        try:
+            yield outcome
+        except requests.RequestException:
+            failed = True
+            raise
+        except DeadlineExceeded:
+            cut_short = True
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            status = outcome.status
+            failed = failed or (status is not None and (status >= 500 or status == 429))
+            # A call cut short by our own deadline says nothing about GitHub
+            # unless it already ran slow: it is never counted as a success,
+            # only as a slow call once it took long enough to be one.
+            if limited:
+                if cut_short and seconds <= self.limiter.latency_target:
+                    self.limiter.abandon()
+                else:
+                    self.limiter.release(failed, seconds)
+            if cut_short and seconds < self.breaker.slow_call_seconds:
+                self.breaker.release_probe()
+            else:
+                self.breaker.record(failed, seconds)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {"circuit": self.breaker.snapshot(), "concurrency": self.limiter.snapshot()}
+
+
+def _guard(resource: str) -> UpstreamGuard:
+    return UpstreamGuard(
+        resource,
+        CircuitBreaker(
+            resource,
+            failure_rate=Environment.CIRCUIT_FAILURE_RATE,
+            slow_call_rate=Environment.CIRCUIT_SLOW_CALL_RATE,
+            slow_call_seconds=Environment.CIRCUIT_SLOW_CALL_SECONDS,
+            open_seconds=Environment.CIRCUIT_OPEN_SECONDS,
+        ),
+        AdaptiveLimiter(
+            initial=Environment.UPSTREAM_CONCURRENCY_INITIAL,
+            maximum=Environment.UPSTREAM_CONCURRENCY_MAX,
+            latency_target=Environment.UPSTREAM_LATENCY_TARGET_SECONDS,
+        ),
+        queue_seconds=Environment.UPSTREAM_QUEUE_SECONDS,
+    )
+
+
+upstream_guards: Dict[str, UpstreamGuard] = {resource: _guard(resource) for resource in ("rest", "graphql")}
+
+
+def upstream_call(resource: str) -> ContextManager[UpstreamCall]:
+    """Guard one GitHub call to ``resource`` (``rest`` or ``graphql``)."""
+    return upstream_guards[resource].call()
+
+
+def collect_metrics() -> Iterable[tuple]:
+    snapshots = {resource: guard.snapshot() for resource, guard in upstream_guards.items()}
+    yield (
+        "commitrecap_upstream_circuit_state",
+        "gauge",
+        "Circuit breaker state per GitHub resource: 0 closed, 1 open, 2 half-open.",
+        [
+            ("commitrecap_upstream_circuit_state", {"resource": resource}, STATE_VALUES[snapshot["circuit"]["state"]])
+            for resource, snapshot in snapshots.items()
+        ],
+    )
+    yield (
+        "commitrecap_upstream_concurrency_limit",
+        "gauge",
+        "Adaptive limit on concurrent calls per GitHub resource.",
+        [
+            ("commitrecap_upstream_concurrency_limit", {"resource": resource}, snapshot["concurrency"]["limit"])
+            for resource, snapshot in snapshots.items()
+        ],
+    )
+    yield (
+        "commitrecap_upstream_in_flight",
+        "gauge",
+        "GitHub calls in flight per resource.",
+        [
+            ("commitrecap_upstream_in_flight", {"resource": resource}, snapshot["concurrency"]["in_flight"])
+            for resource, snapshot in snapshots.items()
+        ],
+    )
+
+
+registry.register_collector(collect_metrics)
@@ -0,0 +1,288 @@
+"""Percentile ranks of a user's year against every recap computed here.
+
+Each recap window has its own cohort, keyed by the first and last day of
+``since``/``until`` so differently spelled timestamps for the same days
+share one; the ``max_windows`` most recently used cohorts are kept. A
+cohort keeps
+one value per user and metric in columnar NumPy arrays (a row per login),
+and a ``RankedColumn`` per metric answering "how many values are below
+x" for rank and histogram queries.
+
+A ``RankedColumn`` is a small log-structured merge layout:
+
+- ``main``: a sorted array, searched with ``np.searchsorted``.
+- ``delta``: values added since the last merge, kept sorted by inserting
+  each one in place (a short memmove), and searched the same way.
+- ``tombstones``: values removed since the last merge (a user's old value
+  when their recap is recomputed), subtracted the same way.
+
+Once delta and tombstones grow past ``1/MERGE_RATIO`` of ``main`` (and at
+least ``MIN_MERGE`` entries), they are merged into a new sorted ``main`` in
+linear time. A rank or histogram query costs three binary searches per
+value looked up, whatever the number of pending updates.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from config.env import Environment
+from telemetry.metrics import registry
+
+METRICS = ("commits", "commit_size_median", "active_days")
+MIN_MERGE = 4096
+MERGE_RATIO = 64
+INITIAL_ROWS = 1024
+
+Window = Tuple[date, date]
+
+
+def _window(since: str, until: str) -> Optional[Window]:
+    """The first and last day of a recap window, or None if they do not parse."""
+    try:
+        return date.fromisoformat(since[:10]), date.fromisoformat(until[:10])
+    except ValueError:
+        return None
+
+
+class _Buffer:
+    """Growable float64 array kept in sorted order."""
+
+    __slots__ = ("data", "size")
+
+    def __init__(self, capacity: int = 256):
+        self.data = np.empty(capacity)
+        self.size = 0
+
+    def insert(self, value: float) -> None:
+        if self.size == len(self.data):
+            self.data = np.resize(self.data, 2 * len(self.data))
+        size = self.size
+        position = int(np.searchsorted(self.data[:size], value, "right"))
+        self.data[position + 1 : size + 1] = self.data[position:size]
+        self.data[position] = value
+        self.size = size + 1
+
+    def view(self) -> np.ndarray:
+        return self.data[: self.size]
+
+    def clear(self) -> None:
+        self.size = 0
+
+
+class RankedColumn:
+    """Multiset of floats with fast rank counts and incremental updates."""
+
+    def __init__(self, values: Optional[np.ndarray] = None):
+        self.main = np.sort(np.asarray(values, dtype=np.float64)) if values is not None else np.empty(0)
+        self.delta = _Buffer()
+        self.tombstones = _Buffer()
+        self.merges = 0
+
+    def __len__(self) -> int:
+        return len(self.main) + self.delta.size - self.tombstones.size
+
+    def add(self, value: float) -> None:
+        self.delta.insert(value)
+        self._maybe_merge()
+
+    def remove(self, value: float) -> None:
+        self.tombstones.insert(value)
+        self._maybe_merge()
+
+    def count_below(self, value: float) -> Tuple[int, int]:
+        """(values < ``value``, values == ``value``)."""
+        below = equal = 0
+        for values, sign in self._runs():
+            lower = int(np.searchsorted(values, value, "left"))
+            upper = int(np.searchsorted(values, value, "right"))
+            below += sign * lower
+            equal += sign * (upper - lower)
+        return below, equal
+
+    def counts_below(self, edges: np.ndarray) -> np.ndarray:
+        """Values below each of the sorted ``edges``."""
+        counts = np.zeros(len(edges), dtype=np.int64)
+        for values, sign in self._runs():
+            counts += sign * np.searchsorted(values, edges, "left")
+        return counts
+
+    def _runs(self) -> Iterable[Tuple[np.ndarray, int]]:
+        """Sorted runs with the sign they count with: ``main``, delta, tombstones."""
+        yield self.main, 1
+        if self.delta.size:
+            yield self.delta.view(), 1
+        if self.tombstones.size:
+            yield self.tombstones.view(), -1
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile, from ``main`` alone unless most values are still in ``delta``."""
+        values = self.main
+        if self.delta.size > len(values):
+            values = np.sort(np.concatenate((values, self.delta.view())))
+        if not len(values):
+            return 0.0
+        return float(values[int(q * (len(values) - 1))])
+
+    def _maybe_merge(self) -> None:
+        pending = self.delta.size + self.tombstones.size
+        if pending >= max(MIN_MERGE, len(self.main) // MERGE_RATIO):
+            self.merge()
+
+    def merge(self) -> None:
+        if not self.delta.size and not self.tombstones.size:
+            return
+        main = self.main
+        if self.delta.size:
+            added = self.delta.view()
+            main = np.insert(main, np.searchsorted(main, added), added)
+        if self.tombstones.size:
+            removed = self.tombstones.view()
+            # The k-th copy of a repeated value removes the k-th equal entry.
+            repeat = np.arange(len(removed)) - np.searchsorted(removed, removed, "left")
+            main = np.delete(main, np.searchsorted(main, removed, "left") + repeat)
+        self.main = main
+        self.delta.clear()
+        self.tombstones.clear()
+        self.merges += 1
+
+
+class Cohort:
+    """Users' metric values for one recap window, in columns with rank indexes."""
+
+    def __init__(self) -> None:
+        self.rows: Dict[str, int] = {}
+        self.values = {metric: np.full(INITIAL_ROWS, np.nan) for metric in METRICS}
+        self.columns = {metric: RankedColumn() for metric in METRICS}
+
+    def observe(self, login: str, metrics: Dict[str, float]) -> None:
+        row = self.rows.get(login)
+        if row is None:
+            row = self.rows[login] = len(self.rows)
+            if row == len(self.values[METRICS[0]]):
+                for metric in METRICS:
+                    grown = np.full(2 * row, np.nan)
+                    grown[:row] = self.values[metric]
+                    self.values[metric] = grown
+        for metric, value in metrics.items():
+            old = self.values[metric][row]
+            if old == value:
+                continue
+            column = self.columns[metric]
+            if not np.isnan(old):
+                column.remove(old)
+            column.add(value)
+            self.values[metric][row] = value
+
+    def value(self, login: str, metric: str) -> Optional[float]:
+        row = self.rows.get(login)
+        if row is None:
+            return None
+        value = self.values[metric][row]
+        return None if np.isnan(value) else float(value)
+
+    def rank(self, metric: str, value: float) -> Dict[str, Any]:
+        column = self.columns[metric]
+        population = len(column)
+        below, equal = column.count_below(value)
+        percentile = 100.0 * (below + 0.5 * equal) / population if population else 0.0
+        return {
+            "value": value,
+            "percentile": round(percentile, 2),
+            "top_percent": round(100.0 - percentile, 2),
+            "population": population,
+        }
+
+    def histogram(self, metric: str, value: float, bins: int) -> Dict[str, Any]:
+        """``bins`` equal-width buckets from 0 to the 99th percentile; the last one is open."""
+        column = self.columns[metric]
+        top = max(column.quantile(0.99), value, 1.0)
+        edges = np.linspace(0.0, top, bins + 1)
+        counts = np.diff(np.append(column.counts_below(edges[:-1]), len(column)))
+        return {
+            "edges": [round(float(edge), 2) for edge in edges[:-1]],
+            "counts": counts.tolist(),
+            "user_bin": int(min(np.searchsorted(edges, value, "right") - 1, bins - 1)),
+        }
+
+
+class CohortIndex:
+    """LRU of cohorts by recap window, fed by the recap controllers."""
+
+    def __init__(self, max_windows: int) -> None:
+        self.max_windows = max(max_windows, 1)
+        self._cohorts: "OrderedDict[Window, Cohort]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"observations": 0, "evictions": 0}
+
+    def observe(self, username: str, since: str, until: str, **metrics: Optional[float]) -> None:
+        """Record a user's metrics for a window; ``None`` values are skipped."""
+        values = {name: float(value) for name, value in metrics.items() if value is not None}
+        window = _window(since, until)
+        if not values or window is None:
+            return
+        with self._lock:
+            cohort = self._cohorts.get(window)
+            if cohort is None:
+                cohort = self._cohorts[window] = Cohort()
+                while len(self._cohorts) > self.max_windows:
+                    self._cohorts.popitem(last=False)
+                    self.stats["evictions"] += 1
+            self._cohorts.move_to_end(window)
+            cohort.observe(username.strip().lower(), values)
+            self.stats["observations"] += 1
+
+    def rank(self, username: str, since: str, until: str, bins: int = 0) -> Dict[str, Any]:
+        """Percentile rank (and optionally a histogram) per metric known for the user."""
+        login = username.strip().lower()
+        ranks: Dict[str, Any] = {}
+        window = _window(since, until)
+        with self._lock:
+            cohort = self._cohorts.get(window) if window is not None else None
+            if cohort is None:
+                return ranks
+            self._cohorts.move_to_end(window)
+            for metric in METRICS:
+                value = cohort.value(login, metric)
+                if value is None:
+                    continue
+                ranks[metric] = cohort.rank(metric, value)
+                if bins:
+                    ranks[metric]["histogram"] = cohort.histogram(metric, value, bins)
+        return ranks
+
+    def collect_metrics(self) -> Iterable[tuple]:
+        with self._lock:
+            stats = dict(self.stats)
+            windows = len(self._cohorts)
+            sizes = {
+                metric: sum(len(cohort.columns[metric]) for cohort in self._cohorts.values())
+                for metric in METRICS
+            }
+        yield (
+            "commitrecap_cohort_events_total",
+            "counter",
+            "Recap results recorded in the cohort index, and cohorts evicted.",
+            [("commitrecap_cohort_events_total", {"event": name}, value) for name, value in stats.items()],
+        )
+        yield (
+            "commitrecap_cohort_windows",
+            "gauge",
+            "Recap windows with a cohort in memory.",
+            [("commitrecap_cohort_windows", {}, windows)],
+        )
+        yield (
+            "commitrecap_cohort_users",
+            "gauge",
+            "Values held in the cohort index by metric, summed over windows.",
+            [("commitrecap_cohort_users", {"metric": metric}, size) for metric, size in sizes.items()],
+        )
+
+
+cohort_index = CohortIndex(max_windows=Environment.COHORT_MAX_WINDOWS)
+registry.register_collector(cohort_index.collect_metrics)
@@ -0,0 +1,180 @@
+"""gzip/brotli response compression, reusing encoded bodies across cache hits."""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import time
+from typing import Optional
+
+from fastapi import FastAPI
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.env import Environment
+from telemetry.instrumentation import current_trace
+from telemetry.metrics import registry
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+# Encoded bodies kept per cache entry; one per encoding is the usual case.
+MAX_VARIANTS_PER_ENTRY = 4
+
+COMPRESSION_BYTES = registry.counter(
+    "commitrecap_compression_bytes_total",
+    "Response bytes before (identity) and after compression, by encoding.",
+    ("encoding", "stage"),
+)
+COMPRESSION_SECONDS = registry.counter(
+    "commitrecap_compression_seconds_total",
+    "CPU time spent compressing responses, by encoding.",
+    ("encoding",),
+)
+COMPRESSION_RESPONSES = registry.counter(
+    "commitrecap_compressed_responses_total",
+    "Compressed responses, by encoding and whether the body came from a cached variant.",
+    ("encoding", "source"),
+)
+
+
+def available_encodings() -> tuple[str, ...]:
+    """Supported encodings, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str, encodings: tuple[str, ...]) -> Optional[str]:
+    """Pick the best of ``encodings`` allowed by an ``Accept-Encoding`` header."""
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+    best: Optional[str] = None
+    best_weight = 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def variant_key(body: bytes, encoding: str) -> tuple[str, bytes]:
+    """Key for an encoded body stored on a cache entry.
+
+    One entry can serve several bodies (e.g. different ``fields=``
+    selections), so the key must not collide between them.
+    """
+    return encoding, hashlib.blake2b(body, digest_size=16).digest()
+
+
+def compress(
+    body: bytes,
+    encoding: str,
+    gzip_level: int = Environment.COMPRESSION_GZIP_LEVEL,
+    brotli_quality: int = Environment.COMPRESSION_BROTLI_QUALITY,
+) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Compress buffered responses of at least ``min_size`` bytes with the
+    best encoding the client accepts. Bodies served from the response
+    cache are compressed once and stored on the cache entry, so later hits
+    reuse the stored bytes.
+    """
+
+    def __init__(self, app: ASGIApp, min_size: int = Environment.COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.min_size = min_size
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            if message.get("more_body") or not self._compressible(start, body):
+                # Streaming or not worth it: send what we have unchanged.
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            encoded = self._encode(body, encoding, start["status"])
+            headers = MutableHeaders(scope=start)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(encoded))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": encoded})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compressible(self, start: Message, body: bytes) -> bool:
+        if len(body) < self.min_size:
+            return False
+        headers = Headers(raw=start.get("headers", []))
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _encode(self, body: bytes, encoding: str, status: int) -> bytes:
+        trace = current_trace()
+        entry = trace.cache_entry if trace is not None and status == 200 else None
+        key = None
+        if entry is not None:
+            key = variant_key(body, encoding)
+            encoded = entry.variants.get(key)
+            if encoded is not None:
+                COMPRESSION_RESPONSES.inc(encoding, "cached")
+                return encoded
+
+        started = time.thread_time()
+        encoded = compress(body, encoding)
+        COMPRESSION_SECONDS.inc(encoding, amount=time.thread_time() - started)
+        COMPRESSION_BYTES.inc(encoding, "identity", amount=len(body))
+        COMPRESSION_BYTES.inc(encoding, "encoded", amount=len(encoded))
+        COMPRESSION_RESPONSES.inc(encoding, "compressed")
+        if key is not None and len(entry.variants) < MAX_VARIANTS_PER_ENTRY:
+            entry.variants[key] = encoded
+        return encoded
+
+
+def setup_compression(app: FastAPI) -> None:
+    app.add_middleware(CompressionMiddleware)
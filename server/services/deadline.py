@@ -0,0 +1,91 @@
+"""Per-request time budgets for upstream GitHub calls."""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from fastapi import FastAPI, HTTPException
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config.env import Environment
+
+UPSTREAM_TIMEOUT_SECONDS = 30.0
+# Below this, an upstream call cannot finish; fail instead of starting it.
+MIN_CALL_SECONDS = 0.05
+
+_current_deadline: ContextVar[Optional["Deadline"]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(HTTPException):
+    """Raised when the request's time budget runs out before or during an upstream call."""
+
+    def __init__(self) -> None:
+        super().__init__(status_code=504, detail={"message": "Request deadline exceeded"})
+
+
+class Deadline:
+    __slots__ = ("budget", "expires_at")
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() < MIN_CALL_SECONDS
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def deadline_expired() -> bool:
+    deadline = _current_deadline.get()
+    return deadline is not None and deadline.expired
+
+
+def upstream_timeout(default: float = UPSTREAM_TIMEOUT_SECONDS) -> float:
+    """Timeout for the next upstream call, capped by the time left in the budget."""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return default
+    remaining = deadline.remaining()
+    if remaining < MIN_CALL_SECONDS:
+        raise DeadlineExceeded()
+    return min(default, remaining)
+
+
+@contextmanager
+def deadline_scope(budget: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """Run the block under a fresh budget, or with no budget when ``budget`` is None."""
+    deadline = Deadline(budget) if budget else None
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+class DeadlineMiddleware:
+    """Give every HTTP request a time budget that upstream calls draw down."""
+
+    def __init__(self, app: ASGIApp, budget: float = Environment.REQUEST_DEADLINE_SECONDS):
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.budget <= 0:
+            await self.app(scope, receive, send)
+            return
+        with deadline_scope(self.budget):
+            await self.app(scope, receive, send)
+
+
+def setup_deadlines(app: FastAPI) -> None:
+    app.add_middleware(DeadlineMiddleware)
@@ -0,0 +1,263 @@
+"""Track the most requested usernames and keep their cached recaps warm.
+
+Request volume is heavily skewed towards a few logins (shared recap cards,
+well-known developers). ``SpaceSaving`` keeps approximate counts for the
+top logins in fixed memory. ``CacheWarmer`` periodically refreshes the
+cache entries of the current top-K logins shortly before they expire, so
+their requests keep hitting fresh entries. The warmer spends at most a
+configured share of each GitHub rate-limit window and stops early when
+the window runs low.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import Request
+
+from config.env import Environment
+from services.cache import CacheEntry, ResponseCache, response_cache
+from services.rate_limit import RateLimitTracker, rate_limits
+from telemetry.instrumentation import trace_scope
+from telemetry.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Halve all counts this often so the top-K follows current traffic.
+DECAY_INTERVAL_SECONDS = 3600.0
+# Without rate-limit headers, budget spend per window of this length.
+DEFAULT_WINDOW_SECONDS = 3600.0
+
+
+class SpaceSaving:
+    """
+    Space-saving heavy-hitter counts (Metwally et al.) over ``capacity``
+    counters. A new key takes over the smallest counter and inherits its
+    count as the error bound, so counts are overestimates by at most
+    ``error``.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(capacity, 1)
+        # key -> [count, error]
+        self._counters: Dict[str, list] = {}
+        # (count, key) pairs, possibly outdated; checked against _counters on pop.
+        self._heap: list = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def observe(self, key: str, weight: float = 1.0) -> None:
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                error = 0.0
+                if len(self._counters) >= self.capacity:
+                    error = self._evict_smallest()
+                counter = self._counters[key] = [error, error]
+            counter[0] += weight
+            heapq.heappush(self._heap, (counter[0], key))
+            if len(self._heap) > 4 * self.capacity + 64:
+                self._rebuild_heap()
+
+    def top(self, k: int) -> list[tuple[str, float, float]]:
+        """The ``k`` largest (key, count, error) triples, largest first."""
+        with self._lock:
+            items = [(key, count, error) for key, (count, error) in self._counters.items()]
+        return heapq.nlargest(k, items, key=lambda item: item[1])
+
+    def decay(self, factor: float = 0.5) -> None:
+        with self._lock:
+            for counter in self._counters.values():
+                counter[0] *= factor
+                counter[1] *= factor
+            self._rebuild_heap()
+
+    def _evict_smallest(self) -> float:
+        while self._heap:
+            count, key = heapq.heappop(self._heap)
+            counter = self._counters.get(key)
+            if counter is not None and counter[0] == count:
+                del self._counters[key]
+                return count
+        return 0.0
+
+    def _rebuild_heap(self) -> None:
+        self._heap = [(count, key) for key, (count, _) in self._counters.items()]
+        heapq.heapify(self._heap)
+
+
+class CacheWarmer:
+    """Background thread refreshing hot logins' cache entries before they expire."""
+
+    def __init__(
+        self,
+        cache: ResponseCache,
+        tracker: SpaceSaving,
+        limits: RateLimitTracker,
+        top_k: int,
+        interval: float,
+        budget_share: float,
+    ):
+        self.cache = cache
+        self.tracker = tracker
+        self.limits = limits
+        self.top_k = top_k
+        self.interval = interval
+        self.budget_share = budget_share
+        # Refresh entries that would expire before the run after next.
+        self.lead_seconds = 2 * interval
+        self._spent: Dict[str, float] = {}
+        self._windows: Dict[str, float] = {}
+        self._last_decay = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = {"runs": 0, "warmed": 0, "failed": 0, "skipped_budget": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache.enabled and self.budget_share > 0 and self.top_k > 0
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.warning("Cache warming run failed", exc_info=True)
+
+    def run_once(self) -> int:
+        """Warm the entries due for refresh; returns how many were refreshed."""
+        now = time.monotonic()
+        if now - self._last_decay >= DECAY_INTERVAL_SECONDS:
+            self.tracker.decay()
+            self._last_decay = now
+        self.stats["runs"] += 1
+
+        hot = {login for login, _, _ in self.tracker.top(self.top_k)}
+        due = sorted(
+            (
+                entry
+                for entry in self.cache.entries()
+                if entry.tag
+                and entry.tag.lower() in hot
+                and not entry.refreshing
+                and entry.fresh_until - now < self.lead_seconds
+            ),
+            key=lambda entry: entry.fresh_until,
+        )
+        warmed = 0
+        for index, entry in enumerate(due):
+            if self._stop.is_set():
+                break
+            if not self._within_budget():
+                self.stats["skipped_budget"] += len(due) - index
+                break
+            if self._warm(entry):
+                warmed += 1
+        return warmed
+
+    def _warm(self, entry: CacheEntry) -> bool:
+        with trace_scope("warm") as trace:
+            refreshed = self.cache.refresh(entry, warmed=True)
+        rest = trace.upstream.get("rest")
+        graphql = trace.upstream.get("graphql")
+        if rest:
+            self._spend("core", rest[0])
+        if graphql:
+            # GraphQL is metered in query cost points; count calls if cost was not reported.
+            self._spend("graphql", graphql[3] or graphql[0])
+        self.stats["warmed" if refreshed else "failed"] += 1
+        return refreshed
+
+    def _window_key(self, resource: str) -> float:
+        window = self.limits.window(resource)
+        if window is not None:
+            return window.reset_at
+        return time.time() // DEFAULT_WINDOW_SECONDS
+
+    def _spend(self, resource: str, amount: float) -> None:
+        window = self._window_key(resource)
+        if self._windows.get(resource) != window:
+            self._windows[resource] = window
+            self._spent[resource] = 0.0
+        self._spent[resource] = self._spent.get(resource, 0.0) + amount
+
+    def _within_budget(self) -> bool:
+        for resource in ("core", "graphql"):
+            allowance = self.budget_share * self.limits.limit(resource)
+            if self._windows.get(resource) == self._window_key(resource):
+                if self._spent.get(resource, 0.0) >= allowance:
+                    return False
+            window = self.limits.window(resource)
+            # Leave the last share of the window to user traffic.
+            if window is not None and window.remaining <= allowance:
+                return False
+        return True
+
+    def budget(self) -> Dict[str, Any]:
+        return {
+            resource: {
+                "spent": self._spent.get(resource, 0.0)
+                if self._windows.get(resource) == self._window_key(resource)
+                else 0.0,
+                "allowance": self.budget_share * self.limits.limit(resource),
+            }
+            for resource in ("core", "graphql")
+        }
+
+    def hit_rate(self) -> float:
+        """Share of warmed entries that were read before being replaced or evicted."""
+        warmed = self.stats["warmed"]
+        return round(self.cache.stats["warmed_hits"] / warmed, 4) if warmed else 0.0
+
+    def collect_metrics(self) -> Iterable[tuple]:
+        stats = dict(self.stats)
+        yield (
+            "commitrecap_cache_warmer_events_total",
+            "counter",
+            "Cache pre-warming runs and refreshes, by event.",
+            [("commitrecap_cache_warmer_events_total", {"event": name}, value) for name, value in stats.items()],
+        )
+        yield (
+            "commitrecap_cache_warmer_hit_ratio",
+            "gauge",
+            "Share of warmed cache entries that served at least one request.",
+            [("commitrecap_cache_warmer_hit_ratio", {}, self.hit_rate())],
+        )
+
+
+hot_usernames = SpaceSaving(Environment.HOT_KEYS_CAPACITY)
+cache_warmer = CacheWarmer(
+    response_cache,
+    hot_usernames,
+    rate_limits,
+    top_k=Environment.HOT_KEYS_TOP_K,
+    interval=Environment.HOT_KEYS_WARM_INTERVAL_SECONDS,
+    budget_share=Environment.HOT_KEYS_WARM_BUDGET_SHARE,
+)
+registry.register_collector(cache_warmer.collect_metrics)
+
+
+def track_username(request: Request) -> None:
+    """Route dependency counting the ``username`` query parameter."""
+    username = request.query_params.get("username")
+    if username:
+        hot_usernames.observe(username.strip().lower())
@@ -0,0 +1,260 @@
+"""Background jobs for endpoints that can outlive an HTTP request.
+
+A job runs one controller call on a small worker pool, outside the
+request that started it, under its own (longer) deadline. Its id is a
+hash of the operation and parameters, so repeating a request joins the
+job that is already queued, running or finished instead of starting
+another. Code running inside a job reports progress with
+``report_progress``; outside a job that call does nothing. Finished jobs
+are kept for ``result_ttl`` seconds.
+
+At most ``max_pending`` jobs are queued or running at once; past that,
+new jobs are refused with 503 until one finishes.
+
+Jobs live in the process that accepted them: they need a long-running
+server, not a per-request runtime such as Lambda. Job mode is therefore
+off unless ``JOB_MODE_ENABLED`` is set, and refused with 501 while off.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from fastapi import HTTPException
+
+from config.env import Environment
+from services.deadline import deadline_scope
+from telemetry.instrumentation import trace_scope
+from telemetry.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Retry-After sent with a 503 when too many jobs are pending.
+PENDING_RETRY_SECONDS = 30
+
+_current_job: ContextVar[Optional["Job"]] = ContextVar("current_job", default=None)
+
+
+def job_id(operation: str, params: Dict[str, Any]) -> str:
+    """Stable id for ``operation`` called with ``params``."""
+    payload = json.dumps([operation, params], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=12).hexdigest()
+
+
+class Job:
+    __slots__ = (
+        "id",
+        "operation",
+        "params",
+        "status",
+        "progress",
+        "result",
+        "error",
+        "created_at",
+        "started_at",
+        "finished_at",
+        "expires_at",
+    )
+
+    def __init__(self, id: str, operation: str, params: Dict[str, Any]):
+        self.id = id
+        self.operation = operation
+        self.params = params
+        self.status = QUEUED
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Monotonic expiry, set once the job finishes.
+        self.expires_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def describe(self) -> Dict[str, Any]:
+        """Status payload; includes the result once the job has succeeded."""
+        payload: Dict[str, Any] = {
+            "id": self.id,
+            "operation": self.operation,
+            "status": self.status,
+            "params": self.params,
+            "progress": dict(self.progress),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == SUCCEEDED:
+            payload["result"] = self.result
+        if self.status == FAILED:
+            payload["error"] = self.error
+        return payload
+
+
+def report_progress(**counters: Any) -> None:
+    """Update the running job's progress counters; a no-op outside a job."""
+    job = _current_job.get()
+    if job is not None:
+        job.progress.update(counters)
+
+
+class JobManager:
+    """Runs jobs on a worker pool and keeps finished ones for ``result_ttl`` seconds."""
+
+    def __init__(
+        self,
+        enabled: bool,
+        max_workers: int,
+        result_ttl: float,
+        max_jobs: int,
+        max_pending: int,
+        deadline: float,
+    ):
+        self.enabled = enabled
+        self.max_workers = max(max_workers, 1)
+        self.result_ttl = result_ttl
+        self.max_jobs = max_jobs
+        self.max_pending = max(max_pending, 1)
+        self.deadline = deadline
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.stats: Dict[str, int] = {
+            "submitted": 0,
+            "joined": 0,
+            "rejected": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "expired": 0,
+        }
+
+    def submit(self, operation: str, func: Callable[..., Any], params: Dict[str, Any]) -> Job:
+        """
+        Start ``func(**params)`` as a job, or return the matching job that exists.
+        Raises 501 while job mode is off and 503 when too many jobs are pending.
+        """
+        if not self.enabled:
+            raise HTTPException(
+                status_code=501,
+                detail={"message": "Background jobs are not enabled on this server, use mode=sync"},
+            )
+        key = job_id(operation, params)
+        with self._lock:
+            self._purge(time.monotonic())
+            job = self._jobs.get(key)
+            # A failed job is retried by the next identical request.
+            if job is not None and job.status != FAILED:
+                self.stats["joined"] += 1
+                return job
+            pending = sum(1 for queued in self._jobs.values() if not queued.finished)
+            if pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail={"message": "Too many background jobs pending, retry later"},
+                    headers={"Retry-After": str(PENDING_RETRY_SECONDS)},
+                )
+            job = self._jobs[key] = Job(key, operation, params)
+            self._jobs.move_to_end(key)
+            self._evict()
+            self.stats["submitted"] += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+            executor = self._executor
+        executor.submit(self._run, job, func)
+        return job
+
+    def get(self, key: str) -> Optional[Job]:
+        with self._lock:
+            self._purge(time.monotonic())
+            return self._jobs.get(key)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Job, func: Callable[..., Any]) -> None:
+        token = _current_job.set(job)
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            with trace_scope("job"), deadline_scope(self.deadline or None):
+                job.result = func(**job.params)
+            job.status = SUCCEEDED
+        except HTTPException as exc:
+            job.error = {"status_code": exc.status_code, "detail": exc.detail}
+            job.status = FAILED
+        except Exception:
+            logger.exception("Job %s (%s) failed", job.id, job.operation)
+            job.error = {"status_code": 500, "detail": {"message": "Internal Server Error"}}
+            job.status = FAILED
+        finally:
+            _current_job.reset(token)
+            job.finished_at = time.time()
+            job.expires_at = time.monotonic() + self.result_ttl
+            with self._lock:
+                self.stats[job.status] += 1
+
+    def _purge(self, now: float) -> None:
+        expired = [
+            key for key, job in self._jobs.items() if job.expires_at is not None and job.expires_at <= now
+        ]
+        for key in expired:
+            del self._jobs[key]
+        self.stats["expired"] += len(expired)
+
+    def _evict(self) -> None:
+        # Over capacity, drop the oldest finished jobs; pending ones are
+        # kept (``max_pending`` bounds them).
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        for key in [key for key, job in self._jobs.items() if job.finished][:excess]:
+            del self._jobs[key]
+
+    def collect_metrics(self) -> Iterable[tuple]:
+        with self._lock:
+            stats = dict(self.stats)
+            by_status: Dict[str, int] = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+            for job in self._jobs.values():
+                by_status[job.status] += 1
+        yield (
+            "commitrecap_job_events_total",
+            "counter",
+            "Background jobs submitted, joined by identical requests, rejected, finished and expired.",
+            [("commitrecap_job_events_total", {"event": name}, value) for name, value in stats.items()],
+        )
+        yield (
+            "commitrecap_jobs",
+            "gauge",
+            "Background jobs currently held, by status.",
+            [("commitrecap_jobs", {"status": status}, count) for status, count in by_status.items()],
+        )
+
+
+job_manager = JobManager(
+    enabled=Environment.JOB_MODE_ENABLED,
+    max_workers=Environment.JOB_WORKERS,
+    result_ttl=Environment.JOB_RESULT_TTL_SECONDS,
+    max_jobs=Environment.JOB_MAX_ENTRIES,
+    max_pending=Environment.JOB_MAX_PENDING,
+    deadline=Environment.JOB_DEADLINE_SECONDS,
+)
+registry.register_collector(job_manager.collect_metrics)
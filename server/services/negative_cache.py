@@ -0,0 +1,234 @@
+"""Short-lived memory of GitHub logins that do not exist.
+
+Unknown, renamed and suspended accounts answer 404 every time, and each
+lookup would otherwise cost a GitHub round trip. Logins that came back
+missing are remembered for ``ttl`` seconds and rejected before any
+upstream call.
+
+The record of missing logins is an insertion-ordered map with expiry
+times (entries share one TTL, so the oldest always expires first). A
+Bloom filter over its keys sits in front of it: most lookups are for
+logins that exist, and those are answered from the filter without taking
+the lock. A filter hit is only a hint; the map decides, so a false
+positive never rejects a real user and invalidation is exact. The
+filter is rebuilt from the map as entries expire, which keeps its
+false-positive rate near the target.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, TypeVar
+
+from fastapi import HTTPException
+
+from config.env import Environment
+from telemetry.instrumentation import current_trace
+from telemetry.metrics import registry
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# One body for every missing-login 404, whether GitHub answered it (REST
+# and GraphQL report it differently) or it was rejected from memory.
+NOT_FOUND_DETAIL = {"message": "Not Found"}
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, using blake2b double hashing."""
+
+    __slots__ = ("size", "hashes", "bits")
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str) -> Iterable[int]:
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for index in range(self.hashes):
+            yield (first + index * second) % self.size
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def fill_ratio(self) -> float:
+        return int.from_bytes(self.bits, "little").bit_count() / self.size
+
+
+def _normalize(login: str) -> str:
+    # GitHub logins are case-insensitive.
+    return login.strip().lower()
+
+
+class NegativeCache:
+    """Logins known to be missing upstream, each remembered for ``ttl`` seconds."""
+
+    def __init__(self, ttl: float, max_entries: int, error_rate: float = 0.01):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.error_rate = error_rate
+        self._expires: "OrderedDict[str, float]" = OrderedDict()
+        self._filter = BloomFilter(max_entries, error_rate)
+        # Filter bits still set for logins that expired or were invalidated.
+        self._dead_bits = 0
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "rejected": 0,
+            "recorded": 0,
+            "invalidated": 0,
+            "filter_false_positives": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def is_missing(self, login: str) -> bool:
+        if not self.enabled:
+            return False
+        key = _normalize(login)
+        if key not in self._filter:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            expires_at = self._expires.get(key)
+            if expires_at is None:
+                self.stats["filter_false_positives"] += 1
+                return False
+            if expires_at <= now:
+                return False
+            self.stats["rejected"] += 1
+            return True
+
+    def record(self, login: str) -> None:
+        if not self.enabled:
+            return
+        key = _normalize(login)
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            self._expires.pop(key, None)
+            self._expires[key] = now + self.ttl
+            while len(self._expires) > self.max_entries:
+                self._expires.popitem(last=False)
+                self._dead_bits += 1
+            self._filter.add(key)
+            self.stats["recorded"] += 1
+
+    def invalidate(self, login: str) -> bool:
+        """Forget ``login``, e.g. once the account exists again. True if it was recorded."""
+        key = _normalize(login)
+        with self._lock:
+            removed = self._expires.pop(key, None) is not None
+            if removed:
+                self._dead_bits += 1
+                self.stats["invalidated"] += 1
+                self._maybe_rebuild()
+        return removed
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._expires)
+            self._expires.clear()
+            self._filter = BloomFilter(self.max_entries, self.error_rate)
+            self._dead_bits = 0
+            self.stats["invalidated"] += count
+        return count
+
+    def logins(self) -> list[str]:
+        now = time.monotonic()
+        with self._lock:
+            return [key for key, expires_at in self._expires.items() if expires_at > now]
+
+    def _purge(self, now: float) -> None:
+        while self._expires:
+            key, expires_at = next(iter(self._expires.items()))
+            if expires_at > now:
+                break
+            del self._expires[key]
+            self._dead_bits += 1
+        self._maybe_rebuild()
+
+    def _maybe_rebuild(self) -> None:
+        # Once expired logins outnumber live ones, rebuild the filter so stale
+        # bits stop sending lookups through the lock.
+        if self._dead_bits <= max(len(self._expires), 64):
+            return
+        rebuilt = BloomFilter(self.max_entries, self.error_rate)
+        for key in self._expires:
+            rebuilt.add(key)
+        self._filter = rebuilt
+        self._dead_bits = 0
+
+    def collect_metrics(self) -> Iterable[tuple]:
+        with self._lock:
+            stats = dict(self.stats)
+            size = len(self._expires)
+            fill_ratio = self._filter.fill_ratio()
+        yield (
+            "commitrecap_negative_cache_events_total",
+            "counter",
+            "Known-missing login lookups, by event.",
+            [("commitrecap_negative_cache_events_total", {"event": name}, value) for name, value in stats.items()],
+        )
+        yield (
+            "commitrecap_negative_cache_entries",
+            "gauge",
+            "Logins currently remembered as missing.",
+            [("commitrecap_negative_cache_entries", {}, size)],
+        )
+        yield (
+            "commitrecap_negative_cache_filter_fill_ratio",
+            "gauge",
+            "Share of Bloom filter bits set; false positives rise with it.",
+            [("commitrecap_negative_cache_filter_fill_ratio", {}, round(fill_ratio, 4))],
+        )
+
+
+missing_logins = NegativeCache(
+    ttl=Environment.NEGATIVE_CACHE_TTL_SECONDS,
+    max_entries=Environment.NEGATIVE_CACHE_MAX_ENTRIES,
+)
+registry.register_collector(missing_logins.collect_metrics)
+
+
+def reject_missing_logins(func: F) -> F:
+    """
+    Fail fast with 404 for a ``username`` GitHub recently reported missing,
+    and remember logins whose lookup comes back 404. Both answer with
+    ``NOT_FOUND_DETAIL``.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        username: Optional[str] = kwargs.get("username")
+        if username and missing_logins.is_missing(username):
+            trace = current_trace()
+            if trace is not None:
+                trace.cache_status = "negative"
+            raise HTTPException(status_code=404, detail=NOT_FOUND_DETAIL)
+        try:
+            return func(*args, **kwargs)
+        except HTTPException as exc:
+            if username and exc.status_code == 404:
+                missing_logins.record(username)
+                raise HTTPException(status_code=404, detail=NOT_FOUND_DETAIL) from exc
+            raise
+
+    return wrapper  # type: ignore[return-value]
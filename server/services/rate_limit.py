@@ -0,0 +1,71 @@
+"""Latest GitHub rate-limit state, as reported by X-RateLimit-* response headers."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional
+
+# GitHub's hourly allowance for an authenticated token, used until a response says otherwise.
+DEFAULT_LIMIT = 5000
+
+
+class RateLimitWindow:
+    __slots__ = ("limit", "remaining", "used", "reset_at", "observed_at")
+
+    def __init__(self, limit: int, remaining: int, used: int, reset_at: float):
+        self.limit = limit
+        self.remaining = remaining
+        self.used = used
+        self.reset_at = reset_at
+        self.observed_at = time.time()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "used": self.used,
+            "reset_at": int(self.reset_at),
+        }
+
+
+class RateLimitTracker:
+    """Keeps the most recent window per resource (``core``, ``graphql``, ...)."""
+
+    def __init__(self) -> None:
+        self._windows: Dict[str, RateLimitWindow] = {}
+        self._lock = threading.Lock()
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        try:
+            limit = int(headers["X-RateLimit-Limit"])
+            remaining = int(headers["X-RateLimit-Remaining"])
+            reset_at = float(headers["X-RateLimit-Reset"])
+        except (KeyError, ValueError):
+            return
+        resource = headers.get("X-RateLimit-Resource", "core")
+        used = int(headers.get("X-RateLimit-Used") or limit - remaining)
+        window = RateLimitWindow(limit, remaining, used, reset_at)
+        with self._lock:
+            current = self._windows.get(resource)
+            # Responses can arrive out of order; keep the lowest remaining per window.
+            if current is None or reset_at > current.reset_at or remaining <= current.remaining:
+                self._windows[resource] = window
+
+    def window(self, resource: str) -> Optional[RateLimitWindow]:
+        with self._lock:
+            window = self._windows.get(resource)
+        if window is not None and window.reset_at <= time.time():
+            return None
+        return window
+
+    def limit(self, resource: str) -> int:
+        window = self.window(resource)
+        return window.limit if window is not None else DEFAULT_LIMIT
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {resource: window.as_dict() for resource, window in self._windows.items()}
+
+
+rate_limits = RateLimitTracker()
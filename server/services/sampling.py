@@ -0,0 +1,136 @@
+"""Stratified sampling estimators for commit-size statistics.
+
+Commits are sampled per stratum (one repo in one calendar month), a few per
+stratum, and each sample is weighted by how many commits its stratum holds.
+Percentiles use the weighted empirical CDF; their confidence intervals use
+Woodruff's method (a normal interval on the CDF at the estimate, mapped
+back through the quantile function). The mean uses the usual stratified
+estimator with a finite-population correction.
+"""
+
+from __future__ import annotations
+
+import calendar
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Sequence, Tuple
+
+Z_95 = 1.959963984540054
+
+Stratum = Tuple[int, Sequence[int]]
+
+
+def _parse(value: str) -> datetime:
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _format(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def month_strata(since: str, until: str) -> list[Tuple[str, str]]:
+    """Split an ISO-8601 window into calendar-month (since, until) pairs."""
+    start = _parse(since)
+    end = _parse(until)
+    strata: list[Tuple[str, str]] = []
+    cursor = start
+    while cursor <= end:
+        last_day = calendar.monthrange(cursor.year, cursor.month)[1]
+        month_end = cursor.replace(day=last_day, hour=23, minute=59, second=59, microsecond=0)
+        strata.append((_format(cursor), _format(min(month_end, end))))
+        cursor = (month_end + timedelta(seconds=1)).replace(hour=0, minute=0, second=0)
+    return strata
+
+
+class _WeightedSample:
+    """Pooled samples with their design weights, sorted by value."""
+
+    def __init__(self, strata: Sequence[Stratum]):
+        self.strata = [(total, sorted(values)) for total, values in strata if total and values]
+        self.population = sum(total for total, _ in self.strata)
+        points = [
+            (value, total / (self.population * len(values)))
+            for total, values in self.strata
+            for value in values
+        ]
+        points.sort()
+        self.values = [value for value, _ in points]
+        self.cumulative: list[float] = []
+        running = 0.0
+        for _, weight in points:
+            running += weight
+            self.cumulative.append(running)
+
+    def quantile(self, q: float) -> int:
+        if not self.values:
+            return 0
+        q = min(max(q, 0.0), 1.0)
+        for value, cumulative in zip(self.values, self.cumulative):
+            if cumulative >= q - 1e-12:
+                return value
+        return self.values[-1]
+
+    def cdf_standard_error(self, x: int) -> float:
+        variance = 0.0
+        for total, values in self.strata:
+            size = len(values)
+            if size >= total:
+                continue
+            share = total / self.population
+            below = sum(1 for value in values if value <= x) / size
+            correction = 1 - size / total
+            variance += share * share * correction * below * (1 - below) / max(size - 1, 1)
+        return math.sqrt(variance)
+
+    def mean(self) -> Tuple[float, float]:
+        estimate = 0.0
+        variance = 0.0
+        for total, values in self.strata:
+            size = len(values)
+            share = total / self.population
+            average = sum(values) / size
+            estimate += share * average
+            if 1 < size < total:
+                spread = sum((value - average) ** 2 for value in values) / (size - 1)
+                variance += share * share * (1 - size / total) * spread / size
+        return estimate, math.sqrt(variance)
+
+
+def stratified_summary(
+    strata: Iterable[Stratum],
+    percentiles: Sequence[int] = (50, 75, 90, 95),
+) -> Dict[str, Any]:
+    """
+    Estimate commit-size percentiles and mean from per-stratum samples.
+    ``strata`` holds (commits in stratum, sampled sizes) pairs.
+    """
+    sample = _WeightedSample(list(strata))
+    if not sample.values:
+        return {"population": 0, "sampled": 0, "percentiles": {}, "intervals": {}, "mean": 0}
+
+    estimates: Dict[int, int] = {}
+    intervals: Dict[str, list[float]] = {}
+    for percentile in percentiles:
+        q = percentile / 100
+        estimate = sample.quantile(q)
+        margin = Z_95 * sample.cdf_standard_error(estimate)
+        estimates[percentile] = estimate
+        intervals[f"p{percentile}"] = [sample.quantile(q - margin), sample.quantile(q + margin)]
+
+    mean, mean_error = sample.mean()
+    intervals["average"] = [
+        round(max(mean - Z_95 * mean_error, 0.0), 2),
+        round(mean + Z_95 * mean_error, 2),
+    ]
+    return {
+        "population": sample.population,
+        "sampled": len(sample.values),
+        "min": sample.values[0],
+        "max": sample.values[-1],
+        "percentiles": estimates,
+        "intervals": intervals,
+        "mean": round(mean, 2),
+    }
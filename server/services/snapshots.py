@@ -0,0 +1,231 @@
+"""Per-user contribution snapshots for incremental year-summary and heatmap refreshes.
+
+A snapshot covers one (login, kind, since, until) window, where ``kind``
+names what the caller fetches (calendar counts or contribution totals).
+Days before its watermark are closed: their contribution counts are
+kept, one ``array('I')`` slot per day, and their totals are summed; none
+of it is fetched again. A refresh only asks GitHub for the days from the
+watermark on, as two aliased windows in one query:
+
+- ``closed``: from the old watermark up to ``overlap_days`` before today.
+  These days are folded into the snapshot and the watermark moves past them.
+- ``open``: the last ``overlap_days`` up to ``until``. These days are
+  fetched on every refresh, because contributions can show up late, and
+  they are never stored.
+
+Once the watermark passes ``until`` (a past year), no query is needed.
+
+Only counts are stored. GitHub's per-day ``color`` is scaled against the
+other days of the requested calendar, so colors from partial windows do
+not combine; callers derive colors from the merged counts instead.
+Snapshots are rebuilt from scratch after ``ttl`` seconds, so days changed
+after they were closed are picked up eventually.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Hashable, Iterable, Optional, Sequence, Tuple
+
+from config.env import Environment
+from telemetry.metrics import registry
+
+ONE_DAY = timedelta(days=1)
+
+Day = Tuple[date, int]
+Window = Tuple[date, date]
+# What a fetch returns for one window: its days' counts and its totals.
+WindowData = Tuple[Sequence[Day], Dict[str, int]]
+
+
+def _add_totals(into: Dict[str, int], totals: Dict[str, int]) -> None:
+    for name, value in totals.items():
+        into[name] = into.get(name, 0) + value
+
+
+class ContributionView:
+    """Daily counts and summed totals for a snapshot's whole window."""
+
+    __slots__ = ("days", "totals", "fetched_days")
+
+    def __init__(self, days: list[Day], totals: Dict[str, int], fetched_days: int):
+        self.days = days
+        self.totals = totals
+        self.fetched_days = fetched_days
+
+
+class ContributionSnapshot:
+    __slots__ = ("since", "until", "watermark", "counts", "totals", "expires_at")
+
+    def __init__(self, since: date, until: date, expires_at: float):
+        self.since = since
+        self.until = until
+        # First day that is not closed yet.
+        self.watermark = since
+        self.counts = array("I")
+        self.totals: Dict[str, int] = {}
+        self.expires_at = expires_at
+
+    def closed_days(self) -> list[Day]:
+        return [(self.since + index * ONE_DAY, count) for index, count in enumerate(self.counts)]
+
+    def close(self, window: Window, data: WindowData) -> None:
+        """Fold the closed ``window`` (starting at the watermark) into the snapshot."""
+        days, totals = data
+        start, end = window
+        grow = (end - self.since).days + 1 - len(self.counts)
+        if grow > 0:
+            self.counts.extend([0] * grow)
+        for day, count in days:
+            if start <= day <= end:
+                self.counts[(day - self.since).days] = count
+        _add_totals(self.totals, totals)
+        self.watermark = end + ONE_DAY
+
+
+Fetcher = Callable[[Optional[Window], Optional[Window]], Tuple[Optional[WindowData], Optional[WindowData]]]
+
+
+class SnapshotStore:
+    """LRU store of contribution snapshots with incremental refresh."""
+
+    def __init__(self, max_entries: int, overlap_days: int, ttl: float):
+        self.max_entries = max_entries
+        self.overlap_days = max(overlap_days, 0)
+        self.ttl = ttl
+        self._snapshots: "OrderedDict[Hashable, ContributionSnapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "unchanged": 0,
+            "incremental": 0,
+            "full": 0,
+            "fetched_days": 0,
+            "expired": 0,
+            "evictions": 0,
+            "invalidated": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def view(
+        self,
+        login: str,
+        kind: str,
+        since: date,
+        until: date,
+        fetch: Fetcher,
+        today: Optional[date] = None,
+    ) -> ContributionView:
+        """
+        Daily counts and totals for ``since``..``until``, fetching only what
+        the ``kind`` snapshot does not hold yet via ``fetch(closed, open)``.
+        """
+        today = today or datetime.now(timezone.utc).date()
+        key = (login.lower(), kind, since, until)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None and snapshot.expires_at <= time.monotonic():
+                del self._snapshots[key]
+                self.stats["expired"] += 1
+                snapshot = None
+            if snapshot is not None:
+                self._snapshots.move_to_end(key)
+                watermark = snapshot.watermark
+                base_days = snapshot.closed_days()
+                totals = dict(snapshot.totals)
+            else:
+                watermark, base_days, totals = since, [], {}
+
+        closed_end = min(until, today - self.overlap_days * ONE_DAY)
+        closed = (watermark, closed_end) if watermark <= closed_end else None
+        open_start = max(watermark, closed_end + ONE_DAY)
+        open_ = (open_start, until) if open_start <= until else None
+        if closed is None and open_ is None:
+            self._count("unchanged")
+            return ContributionView(base_days, totals, 0)
+
+        closed_data, open_data = fetch(closed, open_)
+        fetched_days = sum((window[1] - window[0]).days + 1 for window in (closed, open_) if window)
+        self._count("incremental" if watermark > since else "full")
+        self._count("fetched_days", fetched_days)
+
+        days = list(base_days)
+        for fetched in (closed_data, open_data):
+            if fetched is not None:
+                days.extend(fetched[0])
+                _add_totals(totals, fetched[1])
+
+        if closed is not None and closed_data is not None:
+            self._close(key, since, until, watermark, closed, closed_data)
+        return ContributionView(days, totals, fetched_days)
+
+    def _close(
+        self,
+        key: Hashable,
+        since: date,
+        until: date,
+        watermark: date,
+        closed: Window,
+        data: WindowData,
+    ) -> None:
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is None:
+                if watermark != since:
+                    return
+                snapshot = ContributionSnapshot(since, until, time.monotonic() + self.ttl)
+                self._snapshots[key] = snapshot
+                while len(self._snapshots) > self.max_entries:
+                    self._snapshots.popitem(last=False)
+                    self.stats["evictions"] += 1
+            # A concurrent refresh may have moved the watermark already.
+            if snapshot.watermark == watermark:
+                snapshot.close(closed, data)
+
+    def invalidate(self, login: str) -> int:
+        """Drop every snapshot of ``login``; its next refresh fetches all days again."""
+        login = login.lower()
+        with self._lock:
+            keys = [key for key in self._snapshots if key[0] == login]
+            for key in keys:
+                del self._snapshots[key]
+            self.stats["invalidated"] += len(keys)
+        return len(keys)
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += amount
+
+    def collect_metrics(self) -> Iterable[tuple]:
+        with self._lock:
+            stats = dict(self.stats)
+            size = len(self._snapshots)
+        yield (
+            "commitrecap_snapshot_events_total",
+            "counter",
+            "Contribution snapshot reads by kind of refresh, plus days fetched, expiries and evictions.",
+            [("commitrecap_snapshot_events_total", {"event": name}, value) for name, value in stats.items()],
+        )
+        yield (
+            "commitrecap_snapshot_entries",
+            "gauge",
+            "Contribution snapshots held in memory.",
+            [("commitrecap_snapshot_entries", {}, size)],
+        )
+
+
+contribution_snapshots = SnapshotStore(
+    max_entries=Environment.SNAPSHOT_MAX_ENTRIES,
+    overlap_days=Environment.SNAPSHOT_OVERLAP_DAYS,
+    ttl=Environment.SNAPSHOT_TTL_SECONDS,
+)
+registry.register_collector(contribution_snapshots.collect_metrics)
@@ -0,0 +1,260 @@
+"""Per-request instrumentation of upstream GitHub calls."""
+
+from __future__ import annotations
+
+import functools
+import logging
+import random
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
+
+from fastapi import FastAPI
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.env import Environment
+from telemetry.metrics import registry
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+SAMPLE_RATE = Environment.METRICS_SAMPLE_RATE
+ACCESS_LOG_SAMPLE_RATE = Environment.ACCESS_LOG_SAMPLE_RATE
+ACCESS_LOGGER = "commitrecap.access"
+UNMATCHED_ROUTE = "unmatched"
+REQUEST_ID_HEADER = "x-request-id"
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+access_logger = logging.getLogger(ACCESS_LOGGER)
+
+REQUESTS = registry.counter(
+    "commitrecap_http_requests_total",
+    "HTTP requests handled, by route and status.",
+    ("route", "method", "status"),
+)
+REQUEST_DURATION = registry.histogram(
+    "commitrecap_http_request_duration_seconds",
+    "HTTP request latency, by route.",
+    ("route",),
+)
+UPSTREAM_CALLS_PER_REQUEST = registry.histogram(
+    "commitrecap_upstream_calls_per_request",
+    "GitHub calls made while serving one sampled request, by route.",
+    ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+UPSTREAM_REQUESTS = registry.counter(
+    "commitrecap_upstream_requests_total",
+    "Sampled GitHub calls, by resource, controller function and status.",
+    ("resource", "operation", "status"),
+)
+UPSTREAM_DURATION = registry.histogram(
+    "commitrecap_upstream_request_duration_seconds",
+    "Sampled GitHub call latency, by resource and controller function.",
+    ("resource", "operation"),
+)
+UPSTREAM_BYTES = registry.counter(
+    "commitrecap_upstream_response_bytes_total",
+    "Sampled GitHub response body bytes, by resource and controller function.",
+    ("resource", "operation"),
+)
+GRAPHQL_COST = registry.histogram(
+    "commitrecap_graphql_query_cost",
+    "GraphQL rate-limit cost per sampled query, by controller function.",
+    ("operation",),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 500),
+)
+
+_current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("request_trace", default=None)
+_current_operation: ContextVar[str] = ContextVar("controller_operation", default="unknown")
+
+
+class RequestTrace:
+    """Mutable per-request record shared with the threadpool the request runs in."""
+
+    __slots__ = (
+        "request_id",
+        "sampled",
+        "started",
+        "upstream_calls",
+        "upstream_seconds",
+        "upstream",
+        "cache_status",
+        "cache_entry",
+    )
+
+    def __init__(self, request_id: str, sampled: bool):
+        self.request_id = request_id
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.upstream_calls = 0
+        self.upstream_seconds = 0.0
+        # resource -> [calls, seconds, bytes, graphql cost]
+        self.upstream: Dict[str, list] = {}
+        self.cache_status: Optional[str] = None
+        # Response-cache entry the request was served from, if any.
+        self.cache_entry: Any = None
+
+    def add_upstream(self, resource: str, seconds: float, size: int, cost: int) -> None:
+        entry = self.upstream.get(resource)
+        if entry is None:
+            entry = self.upstream[resource] = [0, 0.0, 0, 0]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] += size
+        entry[3] += cost
+        self.upstream_calls += 1
+        self.upstream_seconds += seconds
+
+    def server_timing(self, total_seconds: float) -> str:
+        parts = []
+        if self.cache_status:
+            parts.append(f'cache;desc="{self.cache_status}"')
+        for resource, (calls, seconds, size, cost) in self.upstream.items():
+            desc = f"{calls} call{'s' if calls != 1 else ''}, {size} B"
+            if cost:
+                desc += f", cost {cost}"
+            parts.append(f'{resource};dur={seconds * 1000:.1f};desc="{desc}"')
+        parts.append(f"app;dur={total_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def _request_id(scope: Scope) -> str:
+    """Reuse a well-formed caller-supplied request id, or mint one."""
+    for name, value in scope.get("headers", ()):
+        if name == REQUEST_ID_HEADER.encode():
+            candidate = value.decode("latin-1")
+            if _VALID_REQUEST_ID.match(candidate):
+                return candidate
+            break
+    return uuid.uuid4().hex
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+def in_operation() -> bool:
+    """Whether the caller runs inside a controller function (see ``operation``)."""
+    return _current_operation.get() != "unknown"
+
+
+@contextmanager
+def trace_scope(name: str, sampled: bool = True) -> Iterator[RequestTrace]:
+    """Trace work done outside a request (e.g. background jobs) like a request."""
+    trace = RequestTrace(f"{name}-{uuid.uuid4().hex[:12]}", sampled)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def is_sampled() -> bool:
+    """Whether upstream calls made in the current context should be recorded."""
+    trace = _current_trace.get()
+    if trace is not None:
+        return trace.sampled
+    return SAMPLE_RATE >= 1 or (SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE)
+
+
+def record_upstream(
+    resource: str,
+    seconds: float,
+    status: int,
+    size: int = 0,
+    cost: int = 0,
+) -> None:
+    """Record one GitHub call against the current request and the metric registry."""
+    operation = _current_operation.get()
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_upstream(resource, seconds, size, cost)
+    UPSTREAM_REQUESTS.inc(resource, operation, str(status))
+    UPSTREAM_DURATION.observe(seconds, resource, operation)
+    UPSTREAM_BYTES.inc(resource, operation, amount=size)
+    if cost:
+        GRAPHQL_COST.observe(cost, operation)
+
+
+def operation(func: F) -> F:
+    """Attribute upstream calls made inside ``func`` to its name."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        token = _current_operation.set(name)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current_operation.reset(token)
+
+    return wrapper  # type: ignore[return-value]
+
+
+class InstrumentationMiddleware:
+    """Time each request, emit ``Server-Timing`` and feed the route histograms."""
+
+    def __init__(self, app: ASGIApp, sample_rate: float = SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        sampled = self.sample_rate >= 1 or (
+            self.sample_rate > 0 and random.random() < self.sample_rate
+        )
+        trace = RequestTrace(_request_id(scope), sampled)
+        token = _current_trace.set(trace)
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = trace.request_id
+                if trace.sampled:
+                    headers.append(
+                        "Server-Timing", trace.server_timing(time.perf_counter() - trace.started)
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            elapsed = time.perf_counter() - trace.started
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            REQUESTS.inc(route_path, scope["method"], str(status))
+            REQUEST_DURATION.observe(elapsed, route_path)
+            if trace.sampled:
+                UPSTREAM_CALLS_PER_REQUEST.observe(trace.upstream_calls, route_path)
+            if access_logger.isEnabledFor(logging.INFO) and (
+                status >= 500 or ACCESS_LOG_SAMPLE_RATE >= 1 or random.random() < ACCESS_LOG_SAMPLE_RATE
+            ):
+                access_logger.info(
+                    "%s %s %d",
+                    scope["method"],
+                    scope["path"],
+                    status,
+                    extra={
+                        "request_id": trace.request_id,
+                        "route": route_path,
+                        "status": status,
+                        "duration_ms": round(elapsed * 1000, 2),
+                        "upstream_calls": trace.upstream_calls,
+                        "upstream_ms": round(trace.upstream_seconds * 1000, 2),
+                    },
+                )
+
+
+def setup_instrumentation(app: FastAPI) -> None:
+    app.add_middleware(InstrumentationMiddleware)
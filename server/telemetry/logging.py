@@ -1,7 +1,127 @@
+import atexit
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+import orjson
+
+from config.env import Environment
+from telemetry.instrumentation import ACCESS_LOGGER, current_trace
+from telemetry.metrics import registry
+
+QUEUE_SIZE = 10_000
+
+# Attributes every LogRecord has; anything else was passed through ``extra``.
+_RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", None, None)).keys()
+) | {"message", "asctime", "request_id"}
+
+_listener: Optional[QueueListener] = None
+
+DROPPED_RECORDS = registry.counter(
+    "commitrecap_log_records_dropped_total",
+    "Log records dropped because the log queue was full.",
+)
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the id of the request being served, if any."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            trace = current_trace()
+            record.request_id = trace.request_id if trace is not None else None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Render a record as one compact JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hand records to a background listener without formatting them first.
+    Records are dropped, not waited on, when the queue is full.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener shares this process, so the message, its args and
+        # any exc_info are formatted there rather than on the request thread.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED_RECORDS.inc()
+
+
+def _setup_json_logging() -> None:
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    log_queue: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(logging.INFO)
+
+    for name in ("uvicorn", "uvicorn.error"):
+        logger = logging.getLogger(name)
+        logger.handlers = []
+        logger.propagate = True
+        logger.setLevel(logging.INFO)
+    # Replaced by the sampled access log the instrumentation middleware emits,
+    # which carries the request id and timing fields.
+    access = logging.getLogger("uvicorn.access")
+    access.handlers = []
+    access.propagate = False
+    logging.getLogger(ACCESS_LOGGER).setLevel(logging.INFO)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
 
 
 def setup_logging() -> None:
+    if Environment.LOG_FORMAT == "json":
+        _setup_json_logging()
+        return
+
+    try:
+        import rich.logging  # noqa: F401
+
+        handler_class = "rich.logging.RichHandler"
+    except ImportError:
+        handler_class = "logging.StreamHandler"
+
     dictConfig(
         {
             "version": 1,
@@ -14,7 +134,7 @@ def setup_logging() -> None:
             },
             "handlers": {
                 "default": {
-                    "class": "rich.logging.RichHandler",
+                    "class": handler_class,
                     "level": "INFO",
                     "formatter": "default",
                 }
@@ -39,6 +159,10 @@ def setup_logging() -> None:
                     "level": "INFO",
                     "propagate": False,
                 },
+                # uvicorn.access already covers local development.
+                ACCESS_LOGGER: {
+                    "level": "WARNING",
+                },
             },
         }
     )
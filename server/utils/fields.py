@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+# A selected field maps to None (take it whole) or to its selected children.
+FieldTree = Dict[str, Optional["FieldTree"]]
+
+
+class FieldSelection:
+    """
+    Response fields requested through ``?fields=``, e.g.
+    ``total_contributions,weeks.contributionDays.date``.
+    Hashable, so it can take part in cache keys.
+    """
+
+    __slots__ = ("tree", "_key")
+
+    def __init__(self, tree: FieldTree):
+        self.tree = tree
+        self._key = ",".join(sorted(self._paths(tree, "")))
+
+    @classmethod
+    def parse(cls, value: Optional[str]) -> Optional["FieldSelection"]:
+        """Parse a comma-separated list of dotted paths; None selects everything."""
+        if not value:
+            return None
+        tree: FieldTree = {}
+        for raw_path in value.split(","):
+            parts = [part.strip() for part in raw_path.split(".") if part.strip()]
+            if not parts:
+                continue
+            node = tree
+            for index, part in enumerate(parts):
+                last = index == len(parts) - 1
+                if part in node and node[part] is None:
+                    break
+                if last:
+                    node[part] = None
+                    break
+                node = node.setdefault(part, {})  # type: ignore[assignment]
+        return cls(tree) if tree else None
+
+    @staticmethod
+    def _paths(tree: FieldTree, prefix: str) -> list[str]:
+        paths = []
+        for key, children in tree.items():
+            path = f"{prefix}{key}"
+            paths.extend([path] if children is None else FieldSelection._paths(children, f"{path}."))
+        return paths
+
+    def wants(self, path: str) -> bool:
+        """Whether anything at or below ``path`` was selected."""
+        node: Optional[FieldTree] = self.tree
+        for part in path.split("."):
+            if node is None:
+                return True
+            if part not in node:
+                return False
+            node = node[part]
+        return True
+
+    def apply(self, payload: Any) -> Any:
+        return _trim(payload, self.tree)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, FieldSelection) and other._key == self._key
+
+    def __hash__(self) -> int:
+        return hash(self._key)
+
+    def __repr__(self) -> str:
+        return f"FieldSelection({self._key!r})"
+
+
+def wants(selection: Optional[FieldSelection], path: str) -> bool:
+    return selection is None or selection.wants(path)
+
+
+def select_fields(payload: Any, selection: Optional[FieldSelection]) -> Any:
+    """Return ``payload`` trimmed to ``selection``, without mutating it."""
+    return payload if selection is None else selection.apply(payload)
+
+
+def _trim(payload: Any, tree: Optional[FieldTree]) -> Any:
+    if tree is None:
+        return payload
+    if isinstance(payload, list):
+        return [_trim(item, tree) for item in payload]
+    if isinstance(payload, dict):
+        return {key: _trim(payload[key], children) for key, children in tree.items() if key in payload}
+    return payload